@@ -0,0 +1,9 @@
+MathJax = {
+    tex: {
+        inlineMath: [['$', '$'], ['\(', '\)']],
+        displayMath: [['$$', '$$'], ['\[', '\]']]
+    },
+    svg: {
+        fontCache: 'global'
+    }
+};
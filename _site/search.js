@@ -0,0 +1,300 @@
+// Client-side search answered from the prebuilt search-index.json and the
+// full-text index shards in search/
+document.addEventListener('DOMContentLoaded', function() {
+    const searchInput = document.getElementById('search-input');
+    const categorySelect = document.getElementById('category-select');
+    const postList = document.querySelector('.post-list');
+    const pagination = document.querySelector('.pagination');
+    const pagePosts = document.querySelectorAll('.post-item');
+    const section = postList ? postList.getAttribute('data-section') : null;
+    let index = null;
+    let loading = null;
+    let results = null;
+    let searchId = 0;
+    const shards = {};
+    // Must match BM25_K1 and BM25_B in build_simple.py
+    const BM25_K1 = 1.2;
+    const BM25_B = 0.75;
+    
+    // The index is only fetched once the reader starts searching
+    function loadIndex() {
+        if (!loading) {
+            loading = fetch('search-index.json')
+                .then(response => response.json())
+                .then(data => {
+                    index = data;
+                    // Deleted posts leave null holes in posts
+                    index.postCount = index.posts.filter(Boolean).length;
+                })
+                .catch(() => { index = false; });
+        }
+        return loading;
+    }
+    
+    function lowerBound(terms, key) {
+        let lo = 0;
+        let hi = terms.length;
+        while (lo < hi) {
+            const mid = (lo + hi) >> 1;
+            if (terms[mid] < key) {
+                lo = mid + 1;
+            } else {
+                hi = mid;
+            }
+        }
+        return lo;
+    }
+    
+    // Ids of the posts containing a term that starts with token
+    function lookup(token) {
+        const ids = new Set();
+        for (let i = lowerBound(index.terms, token);
+             i < index.terms.length && index.terms[i].startsWith(token); i++) {
+            index.postings[i].forEach(id => ids.add(id));
+        }
+        return ids;
+    }
+    
+    // Ids of the posts whose title, description or categories hold a
+    // term starting with every token
+    function prefixSearch(tokens) {
+        let ids = null;
+        tokens.forEach(token => {
+            const matches = lookup(token);
+            ids = ids ? new Set([...ids].filter(id => matches.has(id))) : matches;
+        });
+        return Array.from(ids).sort((a, b) => a - b);
+    }
+    
+    // Must match shard_name() in build_simple.py
+    function loadShard(kind, key) {
+        const name = Array.from(key).map(c =>
+            /^[a-zA-Z0-9]$/.test(c) ? c : '_' + c.codePointAt(0).toString(16)
+        ).join('');
+        const url = 'search/' + kind + '-' + name + '.json';
+        if (!shards[url]) {
+            shards[url] = fetch(url)
+                .then(response => response.ok ? response.json() : {})
+                .catch(() => ({}));
+        }
+        return shards[url];
+    }
+    
+    // Must match gram_shard() in build_simple.py
+    function gramShard(gram) {
+        let hash = 0x811c9dc5;
+        for (const c of gram) {
+            hash = Math.imul(hash ^ c.codePointAt(0), 0x01000193) >>> 0;
+        }
+        return hash % index.gramShards;
+    }
+    
+    function trigrams(term) {
+        const chars = Array.from(term);
+        if (chars.length < 3) return [term];
+        const grams = new Set();
+        for (let i = 0; i + 3 <= chars.length; i++) {
+            grams.add(chars.slice(i, i + 3).join(''));
+        }
+        return Array.from(grams);
+    }
+    
+    // Whether a and b only differ by two neighbouring characters swapped
+    function transposed(a, b) {
+        const x = Array.from(a);
+        const y = Array.from(b);
+        if (x.length !== y.length) return false;
+        let i = 0;
+        while (i < x.length && x[i] === y[i]) i++;
+        return i + 1 < x.length && x[i] === y[i + 1] && x[i + 1] === y[i] &&
+            x.slice(i + 2).join('') === y.slice(i + 2).join('');
+    }
+    
+    // Terms of the corpus sharing enough trigrams with token to count as
+    // the same word, mapped to their (Dice) similarity. A swap of two
+    // neighbouring letters breaks up to three trigrams, so transposed
+    // terms count as similar whatever their score; but only terms sharing
+    // a trigram with token are candidates at all, which rules out swaps in
+    // words of five letters or less ("form" for "from") and other typos
+    // touching every trigram
+    function similarTerms(token) {
+        const grams = trigrams(token);
+        return Promise.all(grams.map(gram =>
+            loadShard('g', String(gramShard(gram))).then(shard => shard[gram] || [])
+        )).then(lists => {
+            const shared = new Map();
+            lists.forEach(terms => terms.forEach(term => shared.set(term, (shared.get(term) || 0) + 1)));
+            const similar = new Map();
+            shared.forEach((count, term) => {
+                const score = 2 * count / (grams.length + trigrams(term).length);
+                if (score >= 0.5) {
+                    similar.set(term, score);
+                } else if (transposed(token, term)) {
+                    similar.set(term, 0.5);
+                }
+            });
+            return similar;
+        });
+    }
+    
+    // BM25 score of every post matching token, a typo costing its similarity
+    function tokenScores(token) {
+        return similarTerms(token).then(similar => Promise.all(
+            Array.from(similar.keys()).map(term =>
+                loadShard('t', Array.from(term).slice(0, 2).join('')).then(shard => [term, shard[term] || []])
+            )
+        ).then(entries => {
+            const scores = new Map();
+            entries.forEach(([term, postings]) => {
+                const df = postings.length;
+                const idf = Math.log(1 + (index.postCount - df + 0.5) / (df + 0.5));
+                postings.forEach(([id, count]) => {
+                    const norm = BM25_K1 * (1 - BM25_B + BM25_B * index.lengths[id] / index.avgLength);
+                    const score = idf * count * (BM25_K1 + 1) / (count + norm) * similar.get(term);
+                    if (score > (scores.get(id) || 0)) scores.set(id, score);
+                });
+            });
+            return scores;
+        }));
+    }
+    
+    // Ids of the posts matching every token anywhere in their text, best first
+    function fullTextSearch(tokens) {
+        return Promise.all(tokens.map(tokenScores)).then(perToken => {
+            const totals = new Map(perToken[0]);
+            perToken.slice(1).forEach(scores => totals.forEach((total, id) => {
+                if (scores.has(id)) {
+                    totals.set(id, total + scores.get(id));
+                } else {
+                    totals.delete(id);
+                }
+            }));
+            return Array.from(totals).sort((a, b) => b[1] - a[1]).map(([id]) => id);
+        });
+    }
+    
+    // Queries search the whole site; the category filter alone stays
+    // within the section this listing shows
+    function search(query, category) {
+        const tokens = query.toLowerCase().match(/[\p{L}\p{N}]+/gu) || [];
+        const ranked = tokens.length ? fullTextSearch(tokens) : Promise.resolve([]);
+        return ranked.then(ids => {
+            let found = index.posts.filter(Boolean).sort((a, b) => b.date.localeCompare(a.date));
+            if (tokens.length) {
+                // Title prefixes catch words still being typed
+                const seen = new Set(ids);
+                found = ids.concat(prefixSearch(tokens).filter(id => !seen.has(id)))
+                    .map(id => index.posts[id]);
+            }
+            return found.filter(post =>
+                (query || !section || post.section === section) &&
+                (!category || post.categories.some(cat => cat.toLowerCase() === category))
+            );
+        });
+    }
+    
+    function element(tag, className, text) {
+        const node = document.createElement(tag);
+        if (className) node.className = className;
+        if (text) node.textContent = text;
+        return node;
+    }
+    
+    // Same markup as the post items of the generated listing pages
+    function renderPost(post) {
+        const item = element('div', 'post-item');
+        if (post.image) {
+            const cover = element('div', 'post-cover-small');
+            const img = element('img');
+            img.src = post.image;
+            img.alt = post.title;
+            img.loading = 'lazy';
+            cover.appendChild(img);
+            item.appendChild(cover);
+        }
+        const title = element('h2', 'post-title');
+        const link = element('a', '', post.title);
+        link.href = post.url;
+        title.appendChild(link);
+        item.appendChild(title);
+        const meta = element('div', 'post-meta');
+        meta.appendChild(element('time', '', post.date));
+        item.appendChild(meta);
+        if (post.categories.length) {
+            const categories = element('div', 'post-categories');
+            post.categories.slice(0, 3).forEach(cat => categories.appendChild(element('span', '', cat)));
+            item.appendChild(categories);
+        }
+        if (post.description) {
+            item.appendChild(element('div', 'post-description', post.description));
+        }
+        return item;
+    }
+    
+    // Fallback when the index cannot be fetched: filter this page's posts
+    function filterPage(query, category) {
+        pagePosts.forEach(post => {
+            const title = post.getAttribute('data-title') || '';
+            const description = post.getAttribute('data-description') || '';
+            const categories = post.getAttribute('data-categories') || '';
+            const show = (!query || title.includes(query) || description.includes(query) || categories.includes(query)) &&
+                         (!category || categories.toLowerCase().includes(category));
+            post.classList.toggle('hidden', !show);
+        });
+    }
+    
+    function filterPosts() {
+        const query = searchInput ? searchInput.value.trim() : '';
+        const category = categorySelect ? categorySelect.value.toLowerCase() : '';
+        const filtering = Boolean(query || category);
+        
+        if (filtering && index === null) {
+            loadIndex().then(filterPosts);
+            return;
+        }
+        if (index === false) {
+            filterPage(query.toLowerCase(), category);
+            return;
+        }
+        
+        const current = ++searchId;
+        if (!filtering) {
+            showResults(null);
+            return;
+        }
+        search(query, category).then(found => {
+            // Drop answers to queries that have since been retyped
+            if (current === searchId) showResults(found);
+        });
+    }
+    
+    // Replace this page's posts with found, or restore them for null
+    function showResults(found) {
+        const filtering = found !== null;
+        if (pagination) {
+            pagination.classList.toggle('hidden', filtering);
+        }
+        pagePosts.forEach(post => post.classList.toggle('hidden', filtering));
+        if (results) {
+            results.remove();
+            results = null;
+        }
+        if (filtering && postList) {
+            results = element('div', 'post-list search-results');
+            found.forEach(post => results.appendChild(renderPost(post)));
+            if (!found.length) {
+                results.appendChild(element('p', 'search-empty', 'No matching posts.'));
+            }
+            postList.after(results);
+        }
+    }
+    
+    if (searchInput) {
+        searchInput.addEventListener('focus', loadIndex, { once: true });
+        searchInput.addEventListener('input', filterPosts);
+    }
+    
+    if (categorySelect) {
+        categorySelect.addEventListener('change', filterPosts);
+    }
+});
\ No newline at end of file
@@ -0,0 +1,218 @@
+#!/usr/bin/env python3
+"""
+End-to-end build benchmark on synthetic sites
+- Generates sites of each requested size with corpus.write_site and times
+  every stage of build_site: a cold build, a full rebuild with warm caches
+  and a no-op incremental build, plus image optimization when Pillow is
+  installed
+- Writes the results as JSON; pass an earlier results file as --baseline
+  to compare stage times against it, e.g. across commits
+- Usage: python3 benchmarks/bench_build.py --posts 25 100 400
+"""
+
+import io
+import os
+import sys
+import json
+import argparse
+import platform
+import tempfile
+import subprocess
+from contextlib import redirect_stdout
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT))
+
+from build_simple import build_site, optimize_images, stage_timer
+from corpus import write_site
+
+SCENARIOS = ("cold", "full", "incremental")
+# Stages faster than this are too noisy to flag against a baseline
+MIN_COMPARED_SECONDS = 0.005
+
+
+def commit_id():
+    """Short hash of the checked out commit, or None outside a git checkout"""
+    try:
+        result = subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"],
+            cwd=ROOT,
+            capture_output=True,
+            text=True,
+            check=True,
+        )
+    except (OSError, subprocess.CalledProcessError):
+        return None
+    return result.stdout.strip()
+
+
+def timed_build(site, jobs, incremental=False):
+    """Build site quietly and return {"total": seconds, "stages": {...}}"""
+    timings = {}
+    with redirect_stdout(io.StringIO()):
+        build_site(site, site / "_site", incremental=incremental, jobs=jobs, timings=timings)
+    return {"total": sum(timings.values()), "stages": timings}
+
+
+def timed_image_optimization(site, jobs):
+    """Seconds optimize_all_images takes on the built site, or None without Pillow"""
+    if optimize_images is None:
+        return None
+    timings = {}
+    lap = stage_timer(timings)
+    with redirect_stdout(io.StringIO()):
+        optimize_images.optimize_all_images(
+            site / "_site", cache_dir=site / optimize_images.CACHE_DIR, jobs=jobs
+        )
+    lap("optimize_images")
+    return timings["optimize_images"]
+
+
+def benchmark_size(posts_per_section, corpus_options, jobs, repeat):
+    """Benchmark one site size; each scenario keeps its fastest of repeat runs"""
+    scenarios = {name: None for name in SCENARIOS}
+    image_seconds = None
+    for _ in range(repeat):
+        with tempfile.TemporaryDirectory() as tmp:
+            site = write_site(Path(tmp), posts_per_section, **corpus_options)
+            source_bytes = sum(
+                path.stat().st_size for path in site.rglob("*") if path.is_file()
+            )
+            runs = {
+                "cold": timed_build(site, jobs),
+                "full": timed_build(site, jobs),
+                "incremental": timed_build(site, jobs, incremental=True),
+            }
+            seconds = timed_image_optimization(site, jobs)
+        for name, run in runs.items():
+            if scenarios[name] is None or run["total"] < scenarios[name]["total"]:
+                scenarios[name] = run
+        if seconds is not None:
+            image_seconds = min(seconds, image_seconds or seconds)
+
+    return {
+        "posts_per_section": posts_per_section,
+        "posts": posts_per_section * 2,
+        "source_bytes": source_bytes,
+        "scenarios": scenarios,
+        "optimize_images": image_seconds,
+    }
+
+
+def print_result(result):
+    """Print one size's stage times as a table"""
+    print(
+        f"\n📊 {result['posts']} posts "
+        f"({result['source_bytes'] / 1024 / 1024:.1f} MB of sources)"
+    )
+    stages = list(result["scenarios"]["cold"]["stages"])
+    print(f"  {'stage':14}" + "".join(f"{name:>14}" for name in SCENARIOS))
+    for stage in stages + ["total"]:
+        row = []
+        for name in SCENARIOS:
+            run = result["scenarios"][name]
+            seconds = run["total"] if stage == "total" else run["stages"].get(stage, 0.0)
+            row.append(f"{seconds * 1000:12.1f}ms")
+        print(f"  {stage:14}" + "".join(row))
+    if result["optimize_images"] is not None:
+        print(f"  optimize_images {result['optimize_images'] * 1000:.1f}ms")
+
+
+def compare(results, baseline, tolerance):
+    """Print stage-time ratios against a baseline run; return the regressions"""
+    previous = {r["posts"]: r for r in baseline["results"]}
+    regressions = []
+    print(f"\n⚖️  Against baseline {baseline.get('commit') or '(unknown commit)'}")
+    for result in results:
+        old = previous.get(result["posts"])
+        if old is None:
+            continue
+        for name in SCENARIOS:
+            new_run, old_run = result["scenarios"][name], old["scenarios"][name]
+            pairs = [("total", new_run["total"], old_run["total"])] + [
+                (stage, seconds, old_run["stages"][stage])
+                for stage, seconds in new_run["stages"].items()
+                if stage in old_run["stages"]
+            ]
+            for stage, seconds, old_seconds in pairs:
+                if old_seconds < MIN_COMPARED_SECONDS:
+                    continue
+                ratio = seconds / old_seconds
+                if ratio > 1 + tolerance:
+                    regressions.append((result["posts"], name, stage, ratio))
+                    print(
+                        f"  ✗ {result['posts']} posts, {name} {stage}: "
+                        f"{old_seconds * 1000:.1f}ms -> {seconds * 1000:.1f}ms ({ratio:.2f}x)"
+                    )
+    if not regressions:
+        print(f"  ✓ no stage slower by more than {tolerance:.0%}")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark build_site on synthetic sites")
+    parser.add_argument(
+        "--posts",
+        type=int,
+        nargs="+",
+        default=[25, 100],
+        help="posts per section; several sizes show how the build scales",
+    )
+    parser.add_argument("--paragraphs", type=int, default=10, help="paragraphs per post")
+    parser.add_argument("--code-blocks", type=int, default=2, help="code blocks per post")
+    parser.add_argument("--math", type=int, default=2, help="math blocks per post")
+    parser.add_argument("--headings", type=int, default=3, help="headings per post")
+    parser.add_argument("--images", type=int, default=1, help="figures per post")
+    parser.add_argument("--seed", type=int, default=0, help="corpus random seed")
+    parser.add_argument("--jobs", "-j", type=int, default=1, help="build worker processes")
+    parser.add_argument("--repeat", type=int, default=1, help="keep the fastest of N runs")
+    parser.add_argument(
+        "--output", default="build_benchmark.json", help="where to write the JSON results"
+    )
+    parser.add_argument("--baseline", help="earlier results JSON to compare against")
+    parser.add_argument(
+        "--tolerance",
+        type=float,
+        default=0.25,
+        help="slowdown against the baseline that counts as a regression",
+    )
+    args = parser.parse_args()
+
+    corpus_options = {
+        "paragraphs": args.paragraphs,
+        "code_blocks": args.code_blocks,
+        "math": args.math,
+        "headings": args.headings,
+        "images": args.images,
+        "seed": args.seed,
+    }
+    results = []
+    for posts_per_section in args.posts:
+        result = benchmark_size(posts_per_section, corpus_options, args.jobs, args.repeat)
+        print_result(result)
+        results.append(result)
+
+    report = {
+        "commit": commit_id(),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "cpus": os.cpu_count(),
+        "jobs": args.jobs,
+        "corpus": corpus_options,
+        "results": results,
+    }
+    with open(args.output, "w", encoding="utf-8") as f:
+        json.dump(report, f, indent=1)
+    print(f"\n💾 Results written to {args.output}")
+
+    if args.baseline:
+        with open(args.baseline, "r", encoding="utf-8") as f:
+            baseline = json.load(f)
+        if compare(results, baseline, args.tolerance):
+            return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
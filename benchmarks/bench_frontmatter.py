@@ -0,0 +1,155 @@
+#!/usr/bin/env python3
+"""
+Conformance and throughput benchmark for frontmatter parsing
+- Parses the repo's own .qmd files and a synthetic corpus of post headers
+  with build_simple.parse_frontmatter and with the parsers it replaced:
+  yaml.safe_load (when PyYAML is installed) and the reference copies in
+  legacy_frontmatter.py
+- Reports how often each parser agrees with build_simple, on which keys
+  they differ, and how many headers per second each one parses
+- Exits non-zero if build_simple disagrees with PyYAML on any header
+- Usage: python3 benchmarks/bench_frontmatter.py --headers 100000
+"""
+
+import sys
+import time
+import argparse
+import datetime
+from collections import Counter
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT))
+
+from build_simple import FRONTMATTER_RE, parse_frontmatter
+from corpus import post_headers
+from legacy_frontmatter import parse_frontmatter_fixed, parse_frontmatter_stack
+
+try:
+    import yaml
+except ImportError:
+    yaml = None
+
+
+def as_strings(value):
+    """PyYAML's typed values as the strings build_simple keeps them as"""
+    if isinstance(value, dict):
+        return {str(k): as_strings(v) for k, v in value.items()}
+    if isinstance(value, list):
+        return [as_strings(v) for v in value]
+    if value is None:
+        return ""
+    if isinstance(value, bool):
+        return "true" if value else "false"
+    if isinstance(value, datetime.date):
+        return value.isoformat()
+    return str(value)
+
+
+def yaml_frontmatter(content):
+    """Frontmatter the way build.py used to read it"""
+    match = FRONTMATTER_RE.match(content)
+    return as_strings(yaml.safe_load(match.group(1))) if match else {}
+
+
+def reference_parsers():
+    """{name: function of content returning its frontmatter}"""
+    parsers = {
+        "stack machine": lambda content: parse_frontmatter_stack(content)[0],
+        "parse_frontmatter_fixed": lambda content: parse_frontmatter_fixed(content)[0],
+    }
+    if yaml is not None:
+        parsers["yaml.safe_load"] = yaml_frontmatter
+    return parsers
+
+
+def differing_keys(expected, actual):
+    """Top-level keys on which two frontmatter dicts differ"""
+    if not isinstance(actual, dict):
+        return ["(error)"]
+    return [
+        key
+        for key in expected.keys() | actual.keys()
+        if expected.get(key) != actual.get(key)
+    ]
+
+
+def conformance(documents, parsers):
+    """Compare every parser with build_simple on every document
+
+    Returns {parser name: (agreeing documents, Counter of differing keys,
+    first differing document)}.
+    """
+    results = {}
+    expected = [parse_frontmatter(content)[0] for content in documents]
+    for name, parse in parsers.items():
+        agree = 0
+        keys = Counter()
+        first = None
+        for content, frontmatter in zip(documents, expected):
+            try:
+                actual = parse(content)
+            except Exception as e:
+                actual = e
+            if actual == frontmatter:
+                agree += 1
+                continue
+            keys.update(differing_keys(frontmatter, actual))
+            first = first or content
+        results[name] = (agree, keys, first)
+    return results
+
+
+def throughput(parse, documents):
+    """Headers parsed per second"""
+    start = time.perf_counter()
+    for content in documents:
+        try:
+            parse(content)
+        except Exception:
+            pass
+    return len(documents) / (time.perf_counter() - start)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark frontmatter parsing")
+    parser.add_argument(
+        "--headers", type=int, default=100000, help="synthetic headers to parse"
+    )
+    count = parser.parse_args().headers
+    repo_files = [
+        path
+        for path in sorted(ROOT.rglob("*.qmd"))
+        if not path.relative_to(ROOT).parts[0].startswith(("_", "."))
+    ]
+    documents = [path.read_text(encoding="utf-8") for path in repo_files]
+    documents += [f"---\n{header}\n---\n\nBody.\n" for header in post_headers(count)]
+
+    parsers = reference_parsers()
+    if yaml is None:
+        print("⚠️  PyYAML not installed: skipping the yaml.safe_load comparison")
+
+    print(f"🔍 Conformance on {len(documents)} headers ({len(repo_files)} from the repo)")
+    failed = False
+    for name, (agree, keys, first) in conformance(documents, parsers).items():
+        print(f"  {name:24} agrees on {agree / len(documents):7.2%}", end="")
+        if keys:
+            common = ", ".join(f"{key} ({n})" for key, n in keys.most_common(3))
+            print(f"  differs on: {common}")
+        else:
+            print()
+        if name == "yaml.safe_load" and first is not None:
+            failed = True
+            print("\n✗ build_simple disagrees with PyYAML, first on:")
+            print(first)
+
+    print(f"\n⚡ Throughput on {len(documents)} headers")
+    parsers = {"build_simple": lambda content: parse_frontmatter(content)[0], **parsers}
+    for name, parse in parsers.items():
+        print(f"  {name:24} {throughput(parse, documents):10,.0f} headers/s")
+
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,48 @@
+#!/usr/bin/env python3
+"""
+Micro-benchmark for page assembly
+- Compares formatting the whole page shell per page with joining the
+  precompiled shell segments from compile_layout
+- Usage: python3 benchmarks/bench_layout.py --pages 10000
+"""
+
+import sys
+import time
+import argparse
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from build_simple import compile_layout, generate_html_layout, render_page_shell
+
+PAGE_TYPES = ["post", "home", "listing", "page"]
+
+
+def time_pages(render, pages, content):
+    """Assemble `pages` pages with render and return the elapsed seconds"""
+    start = time.perf_counter()
+    for i in range(pages):
+        render(f"Post {i} - Thomas W. Bush", content, PAGE_TYPES[i % 4])
+    return time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark page assembly")
+    parser.add_argument("--pages", type=int, default=10000, help="pages to assemble")
+    pages = parser.parse_args().pages
+    content = "<article><p>" + "Lorem ipsum dolor sit amet. " * 200 + "</p></article>"
+
+    for page_type in PAGE_TYPES:
+        compile_layout(page_type)
+
+    formatted = time_pages(render_page_shell, pages, content)
+    compiled = time_pages(generate_html_layout, pages, content)
+
+    print(f"📄 Assembled {pages} pages ({len(content)} bytes of content each)")
+    print(f"  format shell per page: {formatted * 1000:8.1f} ms")
+    print(f"  compiled segments:     {compiled * 1000:8.1f} ms")
+    print(f"  speedup:               {formatted / compiled:8.2f}x")
+
+
+if __name__ == "__main__":
+    main()
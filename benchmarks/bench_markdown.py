@@ -0,0 +1,134 @@
+#!/usr/bin/env python3
+"""
+Worst-case throughput benchmark for markdown rendering
+- Renders every malformed input in corpus.PATHOLOGICAL, and ordinary post
+  bodies for reference, at several lengths with md_to_html and the <img>
+  rewriting render_post_page applies to its output
+- Reports each input's characters per second and how its time grows with
+  its length: an exponent near 1 is linear, near 2 quadratic
+- Exits non-zero if any input grows faster than --max-exponent
+- Usage: python3 benchmarks/bench_markdown.py --chars 25000 50000 100000 200000
+"""
+
+import gc
+import sys
+import math
+import time
+import random
+import argparse
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT))
+
+from build_simple import add_image_dimensions, md_to_html
+from corpus import PATHOLOGICAL, post_body
+
+# Some <img> source must be known for add_image_dimensions to scan the page
+IMAGE_SIZES = {"images/figure_0.png": (640, 480)}
+
+
+def ordinary_posts(chars):
+    """Ordinary post bodies concatenated to about chars characters"""
+    rng = random.Random(0)
+    bodies = []
+    length = 0
+    while length < chars:
+        bodies.append(post_body(rng))
+        length += len(bodies[-1])
+    return "\n".join(bodies)
+
+
+def render(markdown):
+    """The markdown work render_post_page does for one post"""
+    html = md_to_html(markdown, [], time_limit=math.inf)
+    return add_image_dimensions(html, IMAGE_SIZES)
+
+
+def best_time(markdown, repeat):
+    """Fastest of repeat renders, in seconds, with the garbage collector
+    paused as timeit does so its pauses don't skew the growth"""
+    best = math.inf
+    gc.disable()
+    try:
+        for _ in range(repeat):
+            start = time.perf_counter()
+            render(markdown)
+            best = min(best, time.perf_counter() - start)
+    finally:
+        gc.enable()
+    return best
+
+
+def growth_exponent(lengths, seconds):
+    """Least-squares slope of log(seconds) against log(length)"""
+    xs = [math.log(n) for n in lengths]
+    ys = [math.log(max(s, 1e-9)) for s in seconds]
+    mean_x = sum(xs) / len(xs)
+    mean_y = sum(ys) / len(ys)
+    return sum((x - mean_x) * (y - mean_y) for x, y in zip(xs, ys)) / sum(
+        (x - mean_x) ** 2 for x in xs
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark md_to_html on malformed markdown")
+    parser.add_argument(
+        "--chars",
+        type=int,
+        nargs="+",
+        default=[25000, 50000, 100000, 200000],
+        help="input lengths; at least two to measure growth",
+    )
+    parser.add_argument("--repeat", type=int, default=5, help="keep the fastest of N runs")
+    parser.add_argument(
+        "--max-exponent",
+        type=float,
+        default=1.3,
+        help="growth exponent above which an input counts as superlinear",
+    )
+    args = parser.parse_args()
+    lengths = sorted(args.chars)
+    if len(lengths) < 2:
+        parser.error("--chars needs at least two lengths")
+
+    cases = {"ordinary posts": ordinary_posts, **PATHOLOGICAL}
+    print(f"⚡ md_to_html on inputs of {', '.join(f'{n:,}' for n in lengths)} characters")
+    print(
+        f"  {'input':24}"
+        + "".join(f"{f'{n:,}':>11}" for n in lengths)
+        + f"{'chars/s':>13}{'growth':>8}"
+    )
+
+    throughputs = {}
+    superlinear = []
+    for name, generate in cases.items():
+        documents = [generate(n) for n in lengths]
+        seconds = [best_time(markdown, args.repeat) for markdown in documents]
+        exponent = growth_exponent([len(markdown) for markdown in documents], seconds)
+        throughputs[name] = len(documents[-1]) / max(seconds[-1], 1e-9)
+        flag = ""
+        if exponent > args.max_exponent:
+            superlinear.append(name)
+            flag = "  ✗"
+        print(
+            f"  {name:24}"
+            + "".join(f"{s * 1000:9.1f}ms" for s in seconds)
+            + f"{throughputs[name]:13,.0f}{exponent:8.2f}{flag}"
+        )
+
+    ordinary = throughputs.pop("ordinary posts")
+    worst = min(throughputs, key=throughputs.get)
+    print(
+        f"\n  Worst case: {worst}, {throughputs[worst]:,.0f} chars/s "
+        f"({throughputs[worst] / ordinary:.0%} of ordinary posts)"
+    )
+    if superlinear:
+        print(f"\n✗ Superlinear growth on: {', '.join(superlinear)}")
+        return 1
+    print(f"  ✓ every input grows at most as length^{args.max_exponent:g}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,160 @@
+#!/usr/bin/env python3
+"""
+Peak-memory scaling benchmark on synthetic sites
+- Generates sites of each requested size with corpus.write_site and builds
+  each one under tracemalloc, recording every stage's peak and retained
+  bytes and the peak of rendering the largest posts
+- Prints how the build's peak grows with the number of posts, with a
+  least-squares estimate of the fixed and per-post cost, for sizing CI
+  runners; writes the results as JSON
+- Usage: python3 benchmarks/bench_memory.py --posts 25 100 400
+"""
+
+import io
+import os
+import sys
+import json
+import argparse
+import platform
+import tempfile
+import tracemalloc
+from contextlib import redirect_stdout
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT))
+
+from build_simple import build_site, get_all_posts, largest_posts_memory
+from bench_build import commit_id
+from corpus import write_site
+
+MB = 2**20
+
+
+def profile_size(posts_per_section, corpus_options, largest):
+    """Build one synthetic site under tracemalloc and return its memory use"""
+    with tempfile.TemporaryDirectory() as tmp:
+        site = write_site(Path(tmp), posts_per_section, **corpus_options)
+        source_bytes = sum(path.stat().st_size for path in site.rglob("*.qmd"))
+        memory = {}
+        tracemalloc.start()
+        try:
+            with redirect_stdout(io.StringIO()):
+                build_site(site, site / "_site", jobs=1, memory=memory)
+            posts = largest_posts_memory(get_all_posts(site), largest)
+        finally:
+            tracemalloc.stop()
+
+    return {
+        "posts_per_section": posts_per_section,
+        "posts": posts_per_section * 2,
+        "source_bytes": source_bytes,
+        "peak": max(usage["peak"] for usage in memory.values()),
+        "stages": memory,
+        "largest_posts": [
+            {"page": page, "source_bytes": size, "peak": peak} for page, size, peak in posts
+        ],
+    }
+
+
+def print_result(result):
+    """Print one size's per-stage memory as a table"""
+    print(
+        f"\n🧠 {result['posts']} posts "
+        f"({result['source_bytes'] / MB:.1f} MB of markdown), "
+        f"peak {result['peak'] / MB:.1f} MB"
+    )
+    print(f"  {'stage':14}{'peak':>12}{'retained':>12}")
+    for stage, usage in result["stages"].items():
+        print(f"  {stage:14}{usage['peak'] / MB:9.1f} MB{usage['retained'] / MB:+9.1f} MB")
+    for post in result["largest_posts"]:
+        print(
+            f"  {post['page']:40}{post['source_bytes'] / 1024:7.1f} KB"
+            f"{post['peak'] / MB:9.2f} MB"
+        )
+
+
+def fit(results):
+    """Least-squares (fixed bytes, bytes per post) of peak against posts,
+    or None with fewer than two sizes"""
+    if len({r["posts"] for r in results}) < 2:
+        return None
+    n = len(results)
+    mean_x = sum(r["posts"] for r in results) / n
+    mean_y = sum(r["peak"] for r in results) / n
+    slope = sum((r["posts"] - mean_x) * (r["peak"] - mean_y) for r in results) / sum(
+        (r["posts"] - mean_x) ** 2 for r in results
+    )
+    return mean_y - slope * mean_x, slope
+
+
+def print_scaling(results):
+    """Print peak memory against corpus size"""
+    print("\n📈 Scaling")
+    print(f"  {'posts':>7}{'markdown':>12}{'peak':>12}{'per post':>12}  largest stage")
+    for r in results:
+        stage = max(r["stages"], key=lambda name: r["stages"][name]["peak"])
+        print(
+            f"  {r['posts']:7}{r['source_bytes'] / MB:9.1f} MB{r['peak'] / MB:9.1f} MB"
+            f"{r['peak'] / r['posts'] / 1024:9.1f} KB  {stage}"
+        )
+    line = fit(results)
+    if line is not None:
+        fixed, per_post = line
+        print(f"  ≈ {fixed / MB:.1f} MB + {per_post / 1024:.1f} KB per post")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Profile build_site memory on synthetic sites")
+    parser.add_argument(
+        "--posts",
+        type=int,
+        nargs="+",
+        default=[25, 100, 400],
+        help="posts per section; several sizes show how memory scales",
+    )
+    parser.add_argument("--paragraphs", type=int, default=10, help="paragraphs per post")
+    parser.add_argument("--code-blocks", type=int, default=2, help="code blocks per post")
+    parser.add_argument("--math", type=int, default=2, help="math blocks per post")
+    parser.add_argument("--headings", type=int, default=3, help="headings per post")
+    parser.add_argument("--images", type=int, default=1, help="figures per post")
+    parser.add_argument("--seed", type=int, default=0, help="corpus random seed")
+    parser.add_argument("--largest", type=int, default=5, help="largest posts to profile")
+    parser.add_argument(
+        "--output", default="memory_benchmark.json", help="where to write the JSON results"
+    )
+    args = parser.parse_args()
+
+    corpus_options = {
+        "paragraphs": args.paragraphs,
+        "code_blocks": args.code_blocks,
+        "math": args.math,
+        "headings": args.headings,
+        "images": args.images,
+        "seed": args.seed,
+    }
+    results = []
+    for posts_per_section in args.posts:
+        result = profile_size(posts_per_section, corpus_options, args.largest)
+        print_result(result)
+        results.append(result)
+    print_scaling(results)
+
+    line = fit(results)
+    report = {
+        "commit": commit_id(),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "cpus": os.cpu_count(),
+        "corpus": corpus_options,
+        "results": results,
+        "fit": None if line is None else {"fixed": line[0], "per_post": line[1]},
+    }
+    with open(args.output, "w", encoding="utf-8") as f:
+        json.dump(report, f, indent=1)
+    print(f"\n💾 Results written to {args.output}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
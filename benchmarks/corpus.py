@@ -0,0 +1,237 @@
+"""
+Synthetic blog content for the benchmarks
+- post_header makes a post's frontmatter in the styles the real posts use:
+  quoted and plain scalars, trailing comments, flow and block lists, and
+  nested mappings like about.qmd's about.links
+- post_body makes a markdown body with headings, paragraphs, code blocks,
+  math and images, and write_site lays out a whole site of such posts
+- PATHOLOGICAL holds malformed markdown of any length: the unbalanced
+  emphasis, brackets and fences, pasted logs and repeated headings that
+  would make a backtracking renderer quadratic
+- Seeded, so every run builds the same corpus
+"""
+
+import struct
+import random
+import zlib
+from pathlib import Path
+
+WORDS = (
+    "attention tensor einsum gradient matrix kernel layer softmax vector "
+    "reading book memory cache index search query model training loss "
+    "batch shape stride broadcast transformer encoder decoder token"
+).split()
+SECTIONS = ("research", "books")
+ICONS = ("twitter", "linkedin", "github", "file", "envelope")
+
+
+def phrase(rng, low, high):
+    """A few random words"""
+    return " ".join(rng.choice(WORDS) for _ in range(rng.randint(low, high)))
+
+
+def title_line(rng):
+    """A title, plain or quoted, sometimes with characters that need quoting"""
+    title = phrase(rng, 2, 8).capitalize()
+    style = rng.randrange(4)
+    if style == 0:
+        return f"title: {title}"
+    if style == 1:
+        return f'title: "{title}: {phrase(rng, 1, 3)}"'
+    if style == 2:
+        return f"title: '{title}''s {phrase(rng, 1, 2)}'"
+    return f'title: "{title}"'
+
+
+def categories_lines(rng, section):
+    """Categories as a [flow, list] or as a block list"""
+    categories = [section] + [rng.choice(WORDS) for _ in range(rng.randint(0, 3))]
+    if rng.random() < 0.7:
+        return [f"categories: [{', '.join(categories)}]"]
+    return ["categories:"] + [f"  - {category}" for category in categories]
+
+
+def post_header(rng, i):
+    """Frontmatter text (without the "---" fences) of synthetic post i"""
+    section = SECTIONS[i % len(SECTIONS)]
+    lines = [
+        title_line(rng),
+        f"date: {2020 + i % 7}-{1 + i % 12:02d}-{1 + i % 28:02d}",
+    ]
+    lines += categories_lines(rng, section)
+    if rng.random() < 0.6:
+        comment = "  # Shows in listings" if rng.random() < 0.5 else ""
+        lines.append(f'description: "{phrase(rng, 8, 30)}."{comment}')
+    if rng.random() < 0.5:
+        lines.append(f"image: images/{rng.choice(WORDS)}_{i}.png")
+    if rng.random() < 0.6:
+        lines += [
+            "toc: true                             # Optional: table of contents",
+            'toc-title: "Table of Contents"',
+            "toc-location: left",
+        ]
+    if rng.random() < 0.2:
+        lines += ["format:", "  html:", "    page-layout: full", "    toc: false"]
+    if rng.random() < 0.1:
+        lines += ["", "about:", "  template: jolla", "  links:"]
+        for icon in rng.sample(ICONS, rng.randint(1, len(ICONS))):
+            lines += [
+                f"    - icon: {icon}",
+                f"      text: {icon.capitalize()}",
+                f"      href: https://example.com/{icon}/{i}",
+            ]
+    return "\n".join(lines)
+
+
+def post_headers(count, seed=0):
+    """Frontmatter texts of count synthetic posts"""
+    rng = random.Random(seed)
+    return [post_header(rng, i) for i in range(count)]
+
+
+def paragraph(rng):
+    """A paragraph of sentences, most with some inline markup"""
+    sentences = []
+    for _ in range(rng.randint(2, 6)):
+        words = phrase(rng, 6, 18).split()
+        mark = rng.randrange(6)
+        if mark == 0:
+            words[0] = f"**{words[0]}**"
+        elif mark == 1:
+            words[-1] = f"*{words[-1]}*"
+        elif mark == 2:
+            words[1] = f"`{words[1]}()`"
+        elif mark == 3:
+            words[2] = f"[{words[2]}](https://example.com/{words[2]})"
+        sentences.append(" ".join(words).capitalize() + ".")
+    return " ".join(sentences)
+
+
+def code_block(rng):
+    """A fenced Python code block"""
+    name = rng.choice(WORDS)
+    lines = [f"def {name}(x, y):"]
+    for _ in range(rng.randint(2, 10)):
+        lines.append(f"    x = torch.einsum('ij,jk->ik', x, {rng.choice(WORDS)})")
+    lines.append("    return x")
+    return "```python\n" + "\n".join(lines) + "\n```"
+
+
+def math_block(rng):
+    """Display math, and a paragraph with inline math"""
+    a, b = rng.sample(WORDS, 2)
+    return (
+        f"$$\\text{{{a}}}(Q, K, V) = \\text{{softmax}}(\\frac{{QK^T}}{{\\sqrt{{d_k}}}})V$$"
+        f"\n\nHere $X_{{{b}}}$ is the input and $W^T$ the {a} weights."
+    )
+
+
+def post_body(rng, paragraphs=10, code_blocks=2, math=2, headings=3, images=1):
+    """Markdown body with the given numbers of each kind of block, the
+    headings spread evenly through it"""
+    blocks = [paragraph(rng) for _ in range(paragraphs)]
+    blocks += [code_block(rng) for _ in range(code_blocks)]
+    blocks += [math_block(rng) for _ in range(math)]
+    blocks += [
+        f"![{phrase(rng, 1, 3)}](images/figure_{i}.png){{fig-align='center'}}"
+        for i in range(images)
+    ]
+    rng.shuffle(blocks)
+    step = max(1, len(blocks) // max(1, headings))
+    for i in reversed(range(headings)):
+        level = "##" if i % 3 == 0 else "###"
+        blocks.insert(min(i * step, len(blocks)), f"{level} {phrase(rng, 2, 5).title()}")
+    return "\n\n".join(blocks) + "\n"
+
+
+def repeat(unit, chars):
+    """unit repeated to about chars characters"""
+    return unit * max(1, chars // len(unit))
+
+
+def log_lines(chars):
+    """A pasted log: brackets, parentheses and stray asterisks on every line"""
+    line = "[2024-05-01 12:00:00] *** ERROR [worker-3] (pid 42) *ptr** = ![0x7f]\n"
+    return repeat(line, chars)
+
+
+# Name -> function of a length returning markdown of about that many characters
+PATHOLOGICAL = {
+    "asterisk line": lambda n: "*" * n,
+    "unclosed bold": lambda n: repeat("**a ", n),
+    "unclosed italics": lambda n: repeat("* a ", n),
+    "open brackets": lambda n: "[" * n,
+    "open images then url": lambda n: "![" * (n // 4) + "](" + "a" * (n // 2),
+    "images without )": lambda n: repeat("![a](b", n),
+    "links without )": lambda n: repeat("[a](", n),
+    "brackets then url": lambda n: "[" * (n // 2) + "](" + "a" * (n // 2),
+    "nested brackets": lambda n: "[![" * (n // 4) + "]" * (n // 4),
+    "images with open attrs": lambda n: repeat("![a](b){", n),
+    "width attributes": lambda n: "![a](b){" + repeat("width=", n) + "}",
+    "backticks": lambda n: "`" * n,
+    "code fences": lambda n: repeat("```\n", n),
+    "column fences": lambda n: repeat(":::\n\n", n),
+    "repeated headings": lambda n: repeat("# Notes\n\n", n),
+    "heading of <": lambda n: "# " + "<" * n,
+    "heading anchors": lambda n: "# a" + repeat("{#", n) + "}",
+    "raw <img> without >": lambda n: repeat('<img src="x"', n),
+    "pasted log": log_lines,
+    "one long line": lambda n: repeat("word ", n),
+}
+
+
+def png(width, height, rgb):
+    """Bytes of a solid-colour RGB PNG"""
+    def chunk(kind, data):
+        body = kind + data
+        return struct.pack(">I", len(data)) + body + struct.pack(">I", zlib.crc32(body))
+
+    row = b"\x00" + bytes(rgb) * width
+    return (
+        b"\x89PNG\r\n\x1a\n"
+        + chunk(b"IHDR", struct.pack(">IIBBBBB", width, height, 8, 2, 0, 0, 0))
+        + chunk(b"IDAT", zlib.compress(row * height))
+        + chunk(b"IEND", b"")
+    )
+
+
+def write_site(
+    root,
+    posts_per_section=50,
+    paragraphs=10,
+    code_blocks=2,
+    math=2,
+    headings=3,
+    images=1,
+    seed=0,
+):
+    """Write a synthetic site under root: research and books posts with
+    images, an about page and the repo's stylesheet"""
+    root = Path(root)
+    rng = random.Random(seed)
+    repo = Path(__file__).resolve().parent.parent
+    (root / "styles_simple.css").write_bytes((repo / "styles_simple.css").read_bytes())
+    (root / "about.qmd").write_text(
+        "---\ntitle: About Me\n---\n\n" + paragraph(rng) + "\n", encoding="utf-8"
+    )
+
+    i = 0
+    for section in SECTIONS:
+        for n in range(posts_per_section):
+            post_dir = root / section / f"post-{n:05d}"
+            post_dir.mkdir(parents=True)
+            header = post_header(rng, i)
+            # Every post's figures, and its cover when the header names one
+            covers = [line[7:] for line in header.split("\n") if line.startswith("image: ")]
+            body = post_body(rng, paragraphs, code_blocks, math, headings, images)
+            (post_dir / "index.qmd").write_text(
+                f"---\n{header}\n---\n\n{body}", encoding="utf-8"
+            )
+            if images or covers:
+                (post_dir / "images").mkdir()
+            for name in [f"images/figure_{k}.png" for k in range(images)] + covers:
+                size = (rng.randint(200, 1600), rng.randint(150, 900))
+                colour = [rng.randrange(256) for _ in range(3)]
+                (post_dir / name).write_bytes(png(*size, colour))
+            i += 1
+    return root
@@ -10,11 +10,12 @@ Simple static site generator for the blog
 import os
 import re
 import sys
-import yaml
 import shutil
 from datetime import datetime
 from pathlib import Path
 
+from build_simple import parse_frontmatter
+
 # Try to import markdown, fallback to simple conversion if not available
 try:
     import markdown
@@ -24,23 +25,6 @@ except ImportError:
     MD = None
 
 
-def parse_frontmatter(content):
-    """Parse YAML frontmatter from markdown content"""
-    frontmatter = {}
-    body = content
-
-    # Match --- yaml --- pattern
-    match = re.match(r"^---\s*\n(.*?)\n---\s*\n(.*)$", content, re.DOTALL)
-    if match:
-        try:
-            frontmatter = yaml.safe_load(match.group(1))
-            body = match.group(2)
-        except yaml.YAMLError:
-            pass
-
-    return frontmatter, body
-
-
 def md_to_html(md_content):
     """Convert markdown to HTML"""
     if MD:
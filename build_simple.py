@@ -3,238 +3,893 @@
 Simple static site generator for the blog - no external dependencies
 """
 
+import io
 import os
 import re
 import sys
+import gzip
+import json
+import time
 import shutil
+import hashlib
+import importlib.util
+import argparse
+import threading
+import tracemalloc
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
 from datetime import datetime
 from pathlib import Path
 from html import escape
+from bisect import bisect_left, bisect_right
+from contextlib import contextmanager, nullcontext
+from functools import lru_cache
+
+try:
+    import fcntl
+except ImportError:  # Windows: no reflink support
+    fcntl = None
+
+# brotli is optional: with it outputs are also precompressed as .br
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+# Pillow is optional: with it the build also makes responsive image variants
+# (optimize_images warns when it is missing, so it is only imported with it)
+if importlib.util.find_spec("PIL") is not None:
+    import optimize_images
+else:
+    optimize_images = None
+
+MATHJAX_CONFIG_JS = """MathJax = {
+    tex: {
+        inlineMath: [['$', '$'], ['\\(', '\\)']],
+        displayMath: [['$$', '$$'], ['\\[', '\\]']]
+    },
+    svg: {
+        fontCache: 'global'
+    }
+};
+"""
+
+MANIFEST_NAME = ".build_manifest.json"
+MANIFEST_VERSION = 3
+
+# Parsed post frontmatter, kept in the site's base directory between runs;
+# bump the version whenever parse_frontmatter's output changes
+FRONTMATTER_CACHE_NAME = ".frontmatter_cache.json"
+FRONTMATTER_CACHE_VERSION = 3
+
+# How copy_assets publishes files into the output directory; reflinks and
+# hardlinks fall back to a plain copy where the filesystem can't make them
+ASSET_MODES = ("copy", "reflink", "hardlink")
+FICLONE = 0x40049409  # Linux ioctl cloning one file's data blocks into another
+
+# Posts per listing page; index.html, index-2.html, ... (0 = one page)
+LISTING_PAGE_SIZE = 10
+
+
+FRONTMATTER_RE = re.compile(r"^---\s*\n(.*?)\n---\s*\n(.*)$", re.DOTALL)
+# Quoted scalars, and the items of a [flow, list]
+DOUBLE_QUOTED_RE = re.compile(r'"((?:[^"\\]|\\.)*)"')
+SINGLE_QUOTED_RE = re.compile(r"'((?:[^']|'')*)'")
+ESCAPE_RE = re.compile(r"\\(.)")
+YAML_ESCAPES = {"n": "\n", "t": "\t", "0": "\0"}
+FLOW_ITEM_RE = re.compile(r'\s*("(?:[^"\\]|\\.)*"|\'(?:[^\']|\'\')*\'|[^,\]"\']*)\s*([,\]])')
 
 
 def parse_frontmatter(content):
-    """Parse YAML frontmatter from markdown content with nested structure support"""
-    frontmatter = {}
-    body = content
-
-    match = re.match(r"^---\s*\n(.*?)\n---\s*\n(.*)$", content, re.DOTALL)
-    if match:
-        yaml_text = match.group(1)
-        body = match.group(2)
-
-        lines = yaml_text.split("\n")
-        i = 0
-        stack = [
-            {"data": frontmatter, "indent": -1}
-        ]  # Stack to track nested structures
-
-        while i < len(lines):
-            line = lines[i].rstrip()
-            i += 1
+    """Split markdown content into its parsed YAML frontmatter and body"""
+    with trace_span("parse_frontmatter", chars=len(content)):
+        split = split_frontmatter(content)
+        if not split:
+            return {}, content
+        return parse_yaml(split[0]), split[1]
 
-            if not line or ":" not in line:
-                continue
 
-            indent = len(line) - len(line.lstrip())
-            line = line.strip()
+def split_frontmatter(content):
+    """(frontmatter text, body) as FRONTMATTER_RE splits them, or None
 
-            # Pop stack until we find the right parent
-            while stack and stack[-1]["indent"] >= indent:
+    The usual "---\n...\n---\n" header is split with str.find, which is
+    several times faster than the lazy DOTALL match; anything else is left
+    to the regex.
+    """
+    if content[:4] == "---\n" and not content[4:5].isspace():
+        end = content.find("\n---", 4)
+        if end > 0 and content[end + 4 : end + 5] == "\n":
+            # The body starts after the last newline of the blank run
+            # following the fence, as the greedy \s*\n takes it
+            pos = end + 5
+            while content[pos : pos + 1].isspace():
+                pos += 1
+            return content[4:end], content[content.rfind("\n", 0, pos) + 1 :]
+    match = FRONTMATTER_RE.match(content)
+    return match.groups() if match else None
+
+
+def parse_scalar(value):
+    """Value of a YAML scalar: quotes and escapes resolved, a trailing
+    comment dropped; every scalar stays a string"""
+    quote = value[:1]
+    if quote == '"':
+        if "\\" not in value:
+            end = value.find('"', 1)
+            if end > 0:
+                return value[1:end]
+        match = DOUBLE_QUOTED_RE.match(value)
+        if match:
+            return ESCAPE_RE.sub(
+                lambda m: YAML_ESCAPES.get(m.group(1), m.group(1)), match.group(1)
+            )
+    elif quote == "'":
+        match = SINGLE_QUOTED_RE.match(value)
+        if match:
+            return match.group(1).replace("''", "'")
+    comment = value.find(" #")
+    if comment >= 0:
+        value = value[:comment]
+    return value.strip()
+
+
+def parse_flow_list(value):
+    """Items of a "[a, 'b', c]" value, or None if it is not a flow list"""
+    inner = value[1:-1]
+    if value[-1] == "]" and not any(c in inner for c in "[]\"'#"):
+        # Plain items, the common case: no quoting or comments to resolve
+        return [item for item in map(str.strip, inner.split(",")) if item]
+    items = []
+    pos = 1
+    while True:
+        match = FLOW_ITEM_RE.match(value, pos)
+        if not match:
+            return None
+        if match.group(1):
+            items.append(parse_scalar(match.group(1)))
+        pos = match.end()
+        if match.group(2) == "]":
+            return items
+
+
+def split_key(text):
+    """Split "key: value" into (key, value); None if text is no mapping entry"""
+    sep = text.find(": ")
+    if sep < 0:
+        if not text.endswith(":"):
+            return None
+        sep = len(text) - 1
+    key = text[:sep].rstrip()
+    if key[:1] in ("'", '"'):
+        key = key.strip("'\"")
+    return key, text[sep + 1 :].strip()
+
+
+def parse_yaml(text):
+    """Parse the YAML subset posts use, in one pass over the lines
+
+    Covers block mappings and sequences nested by indentation (including
+    sequences of mappings), [flow, lists], quoted and plain scalars and
+    comments. Each line is handled once: the stack holds the open
+    containers with the indentation of their entries, and a line only pops
+    the containers it closes.
+    """
+    root = {}
+    stack = [(0, root)]
+    # A "key:" with no value; what follows decides if it opens a mapping
+    # or a sequence
+    pending = None
+
+    for line in text.split("\n"):
+        if line[:1].isspace():
+            content = line.lstrip()
+            indent = len(line) - len(content)
+            content = content.rstrip()
+        else:
+            content = line.rstrip()
+            indent = 0
+        if not content or content[0] == "#":
+            continue
+        is_item = content[0] == "-" and content[1:2] in ("", " ")
+
+        if pending:
+            parent, key, key_indent = pending
+            pending = None
+            if indent > key_indent or (indent == key_indent and is_item):
+                parent[key] = [] if is_item else {}
+                stack.append((indent, parent[key]))
+
+        if indent == 0 and not is_item:
+            # A top-level key, the common case, closes everything open
+            if len(stack) > 1:
+                del stack[1:]
+            container = root
+        else:
+            # A sequence may sit at its key's indentation, so a key at that
+            # indentation closes it too
+            while len(stack) > 1 and (
+                indent < stack[-1][0]
+                or (indent == stack[-1][0] and not is_item and type(stack[-1][1]) is list)
+            ):
                 stack.pop()
+            container = stack[-1][1]
 
-            current = stack[-1]["data"] if stack else frontmatter
-
-            # Handle array items (start with -)
-            if line.startswith("- "):
-                item = line[2:].strip()
-
-                # If current is a dict and we're in an array context, create object
-                if isinstance(current, dict) and ":" in item:
-                    obj = {}
-                    k, v = item.split(":", 1)
-                    obj[k.strip()] = v.strip(" '\"")
-
-                    # Collect additional properties for this object
-                    while i < len(lines) and lines[i].startswith(" " * (indent + 2)):
-                        sub_line = lines[i].strip()
-                        if ":" in sub_line:
-                            sk, sv = sub_line.split(":", 1)
-                            obj[sk.strip()] = sv.strip(" '\"")
-                        i += 1
-
-                    # Add to parent's array
-                    parent_key = None
-                    for key, val in current.items():
-                        if isinstance(val, list):
-                            parent_key = key
-                            break
-
-                    if parent_key:
-                        current[parent_key].append(obj)
+        if is_item:
+            if type(container) is not list:
+                continue
+            item = content[1:].lstrip()
+            entry = None if item[:1] in ("'", '"', "[") else split_key(item)
+            if entry is None:
+                container.append(parse_scalar(item))
                 continue
+            # "- key: value" opens a mapping whose keys line up with "key"
+            mapping = {}
+            container.append(mapping)
+            indent += len(content) - len(item)
+            stack.append((indent, mapping))
+            container = mapping
+            key, value = entry
+        elif type(container) is dict:
+            # split_key, inlined for the line-per-key common case
+            key, sep, value = content.partition(": ")
+            if not sep:
+                if content[-1] != ":":
+                    continue
+                key = content[:-1]
+            key = key.rstrip()
+            if key[:1] in ("'", '"'):
+                key = key.strip("'\"")
+            value = value.lstrip()
+        else:
+            continue
 
-            # Regular key: value
-            key, value = line.split(":", 1)
-            key = key.strip()
-            value = value.strip()
-
-            # Handle arrays: [item1, item2]
-            if value.startswith("[") and value.endswith("]"):
-                items = [
-                    item.strip().strip(" '\"")
-                    for item in value[1:-1].split(",")
-                    if item.strip()
-                ]
-                current[key] = items
+        first = value[:1]
+        if not first or first == "#":
+            container[key] = ""
+            pending = (container, key, indent)
+        elif first == "[":
+            items = parse_flow_list(value)
+            container[key] = items if items is not None else parse_scalar(value)
+        elif first in ("'", '"') or " #" in value:
+            container[key] = parse_scalar(value)
+        else:
+            # Plain scalar, the common case
+            container[key] = value
 
-            # Handle nested structure (next line is indented with array items)
-            elif i < len(lines) and lines[i].strip().startswith("- "):
-                # This is a parent key for nested array
-                current[key] = []
-                stack.append({"data": {key: current[key]}, "indent": indent})
+    return root
 
-            # Handle simple value
-            else:
-                # If value looks like it should be nested but isn't, create nested structure
-                if (
-                    not value
-                    and i < len(lines)
-                    and (len(lines[i]) - len(lines[i].lstrip())) > indent
-                ):
-                    current[key] = {}
-                    stack.append({"data": current[key], "indent": indent})
-                else:
-                    current[key] = value.strip(" '\"")
 
-    return frontmatter, body
+FRONTMATTER_FENCE_RE = re.compile(rb"---\s*\n")
+
 
+def read_frontmatter(path):
+    """Parse a file's frontmatter, reading no further than its closing "---"
 
-def md_to_html(md_content):
-    """Convert markdown to simple HTML"""
-    html = md_content
+    Returns (frontmatter, body offset), the offset being where
+    parse_frontmatter's body would start in the file (0 when there is no
+    frontmatter), so the body can be read later with read_body.
+    """
+    with open(path, "rb") as f:
+        header = [f.readline()]
+        if not FRONTMATTER_FENCE_RE.fullmatch(header[0]):
+            return {}, 0
+        for line in f:
+            header.append(line)
+            if len(header) > 2 and FRONTMATTER_FENCE_RE.fullmatch(line):
+                break
+        else:
+            return {}, 0
 
-    # Remove Quarto column syntax
-    html = re.sub(r"^:::*\s*\{[^}]*\}\s*\n?", "", html, flags=re.MULTILINE)
-    html = re.sub(r"^::\+\s*\{[^}]*\}\s*\n?", "", html, flags=re.MULTILINE)
-    html = re.sub(r"^:+\s*\n", "", html, flags=re.MULTILINE)
+        # Blank lines after the fence belong to the header, as they do in
+        # parse_frontmatter
+        offset = f.tell()
+        for line in iter(f.readline, b""):
+            if line.strip() or not line.endswith(b"\n"):
+                break
+            offset = f.tell()
 
-    # Protect code blocks with placeholders FIRST
-    code_blocks = []
+    text = b"".join(header).decode("utf-8").replace("\r\n", "\n")
+    frontmatter, body = parse_frontmatter(text)
+    return frontmatter, 0 if body else offset
 
-    def save_code_block(m):
-        code_blocks.append(m.group(0))
-        return f"\n__CODE_BLOCK_{len(code_blocks) - 1}__\n"
 
-    html = re.sub(r"```[\w]*.*?```", save_code_block, html, flags=re.DOTALL)
+def read_body(path, offset=0):
+    """Read a file's text from offset on, with newlines translated as in
+    text mode"""
+    with open(path, "rb") as f:
+        f.seek(offset)
+        return io.TextIOWrapper(f, encoding="utf-8").read()
 
-    # Protect inline code
-    inline_codes = []
 
-    def save_inline_code(m):
-        inline_codes.append(m.group(0))
-        return f"__INLINE_CODE_{len(inline_codes) - 1}__"
+# Stands in for an inline code span while a line is tokenized, so that code
+# is opaque to headings, emphasis and links without any restore pass
+INLINE_CODE_MARK = "\ufffc"
 
-    html = re.sub(r"`[^`]+`", save_inline_code, html)
+COLUMN_FENCE_RE = re.compile(r"::(?:\+|:*)\s*")
+FENCE_ATTRS_RE = re.compile(r"\{[^}]*\}")
+WORD_RE = re.compile(r"\w+")
+URL_RE = re.compile(r"[^)\s]+")
+DIGITS_RE = re.compile(r"\d+")
+TAG_RE = re.compile(r"<[^>]*>")
+# Seconds md_to_html may spend on one document before rendering the rest of
+# it as plain text
+RENDER_TIME_LIMIT = 5.0
 
-    # Headers (h1-h6) - strip {#id} custom anchor syntax
-    for i in range(6, 0, -1):
 
-        def make_header(level):
-            def replacer(m):
-                text = m.group(1)
-                text = re.sub(r"\s*\{#[^}]+\}\s*$", "", text)
-                return f"<h{level}>{text}</h{level}>"
+def sub_tags(pattern, repl, html):
+    """pattern.sub(repl, html) for a pattern whose matches end in ">"
 
-            return replacer
+    Only html up to its last ">" is searched: past it every "<" would fail
+    only after scanning to the end, which is quadratic in a long run of them.
+    """
+    last = html.rfind(">") + 1
+    if last == len(html):
+        return pattern.sub(repl, html)
+    return pattern.sub(repl, html[:last]) + html[last:]
+
+
+def strip_column_fences(text):
+    """Drop Quarto column fences (::: {.columns} ... :::) in one pass over the lines"""
+    if ":" not in text:
+        return text
+
+    lines = text.split("\n")
+    last = len(lines) - 1
+    out = []
+    at_line_start = True
+    # After a {..} fence, following blank lines and the next line's
+    # indentation are swallowed ("indent"); after a bare ::: fence only the
+    # blank lines are ("blank")
+    eat = None
+
+    i = 0
+    while i <= last:
+        line = lines[i]
+        i += 1
+        if eat and not line.strip():
+            if eat == "indent" or i <= last:
+                continue
+        elif eat == "indent":
+            stripped = line.lstrip()
+            at_line_start = stripped == line
+            line = stripped
+        eat = None
+
+        fence = COLUMN_FENCE_RE.match(line) if at_line_start else None
+        at_line_start = True
+        if fence:
+            rest = line[fence.end() :]
+            next_line = i
+            if not rest:
+                # The attribute block may sit on a following line
+                j = i
+                while j <= last and not lines[j].strip():
+                    j += 1
+                if j <= last and lines[j].lstrip().startswith("{"):
+                    rest = lines[j].lstrip()
+                    next_line = j + 1
+            attrs = FENCE_ATTRS_RE.match(rest)
+            if attrs:
+                i = next_line
+                line = rest[attrs.end() :].lstrip()
+                if not line:
+                    eat = "indent"
+                    continue
+
+        if i <= last and line.startswith(":") and not line.lstrip(":").strip():
+            eat = "blank"
+            continue
 
-        pattern = "^" + "#" * i + r"\s+(.+)$"
-        html = re.sub(pattern, make_header(i), html, flags=re.MULTILINE)
+        out.append(line)
+
+    return "\n".join(out)
+
+
+def split_code_fences(text):
+    """Split text into alternating prose strings and fenced code block dicts"""
+    parts = []
+    pos = 0
+    while True:
+        start = text.find("```", pos)
+        if start < 0:
+            break
+        end = text.find("```", start + 3)
+        if end < 0:
+            break
+        inner = text[start + 3 : end]
+        lang = WORD_RE.match(inner)
+        parts.append(text[pos:start])
+        parts.append(
+            {
+                "lang": lang.group(0) if lang else "",
+                "content": inner[lang.end() :] if lang else inner,
+            }
+        )
+        pos = end + 3
+    parts.append(text[pos:])
+    return parts
+
+
+def extract_inline_code(text, codes):
+    """Replace `code` spans with INLINE_CODE_MARK, collecting their source in codes"""
+    if "`" not in text:
+        return text
+
+    out = []
+    pos = search = 0
+    while True:
+        start = text.find("`", search)
+        if start < 0:
+            break
+        end = text.find("`", start + 1)
+        if end < 0:
+            break
+        if end == start + 1:
+            search = end
+            continue
+        out.append(text[pos:start])
+        out.append(INLINE_CODE_MARK)
+        codes.append(text[start : end + 1])
+        pos = search = end + 1
+    out.append(text[pos:])
+    return "".join(out)
+
+
+def strip_heading_anchor(text):
+    """Remove a trailing Quarto {#id} anchor from heading text"""
+    stripped = text.rstrip()
+    if not stripped.endswith("}"):
+        return text
+    close = len(stripped) - 1
+    start = stripped.find("{#", stripped.rfind("}", 0, close) + 1)
+    if start < 0 or start + 2 >= close:
+        return text
+    return stripped[:start].rstrip()
+
+
+def parse_line(line, code_index):
+    """Classify one source line as a heading or a text line"""
+    level = len(line) - len(line.lstrip("#"))
+    if 1 <= level <= 6 and level < len(line) and line[level].isspace():
+        text = line[level:].lstrip()
+        if text:
+            return {
+                "type": "heading",
+                "level": level,
+                "text": strip_heading_anchor(text),
+                "code_index": code_index,
+            }
+    return {"type": "text", "text": line, "code_index": code_index}
 
-    # Bold
-    html = re.sub(r"\*\*(.+?)\*\*", r"<strong>\1</strong>", html)
 
-    # Italic
-    html = re.sub(r"\*(.+?)\*", r"<em>\1</em>", html)
+def parse_blocks(md_content):
+    """Tokenize markdown into paragraphs of heading, text and code lines
 
-    # Images ![alt](url)
-    html = re.sub(
-        r"!\[([^\]]*)\]\(([^\)\s]+)\)(?!\{)",
-        r'<img src="\2" alt="\1" class="img-fluid" loading="lazy">',
-        html,
-    )
-    html = re.sub(
-        r"!\[([^\]]*)\]\(([^\)\s]+)\)\{[^}]*width=(\d+)%[^}]*\}",
-        r'<img src="\2" alt="\1" class="img-fluid" style="width: \3%;" loading="lazy">',
-        html,
-    )
-    html = re.sub(
-        r"!\[([^\]]*)\]\(([^\)\s]+)\)\{[^}]*\}",
-        r'<img src="\2" alt="\1" class="img-fluid" loading="lazy">',
-        html,
-    )
+    Returns (paragraphs, codes): each paragraph is a list of line dicts and
+    codes holds the source of every inline code span in document order.
+    """
+    if INLINE_CODE_MARK in md_content:
+        md_content = md_content.replace(INLINE_CODE_MARK, "\ufffd")
 
-    # Links [text](url)
-    html = re.sub(r"\[([^\]]+)\]\(([^\)\s]+)\)", r'<a href="\2">\1</a>', html)
+    codes = []
+    paragraphs = []
+    current = []
 
-    # Line breaks and paragraphs - DO THIS BEFORE restoring code blocks
-    paragraphs = re.split(r"\n\s*\n", html)
-    result = []
-    for p in paragraphs:
-        p = p.strip()
-        if not p:
+    parts = split_code_fences(strip_column_fences(md_content))
+    for n, part in enumerate(parts):
+        if n % 2:
+            current.append({"type": "code", **part})
             continue
-        if p.startswith("<h") or p.startswith("__CODE_BLOCK_"):
-            result.append(p)
-        else:
-            p = p.replace("\n", "<br>")
-            result.append(f"<p>{p}</p>")
-    html = "\n".join(result)
-
-    # Restore inline code
-    for i, code in enumerate(inline_codes):
-        html = html.replace(f"__INLINE_CODE_{i}__", code)
-
-    # Restore code blocks and convert to HTML
-    for i, code in enumerate(code_blocks):
-        lang_match = re.match(r"```(\w+)", code)
-        if lang_match:
-            lang = lang_match.group(1)
-            content = code[3 + len(lang) : -3]
-            code_html = (
-                f'<pre><code class="language-{lang}">{escape(content)}</code></pre>'
+
+        code_index = len(codes)
+        for line in extract_inline_code(part, codes).split("\n"):
+            if line.strip():
+                current.append(parse_line(line, code_index))
+                code_index += line.count(INLINE_CODE_MARK)
+            elif current:
+                paragraphs.append(current)
+                current = []
+
+    if current:
+        paragraphs.append(current)
+    return paragraphs, codes
+
+
+def emphasis_markers(text):
+    """Find **bold** and *italic* delimiters line by line
+
+    Bold pairs are matched first, then italics among the remaining asterisks,
+    mirroring the precedence the renderer has always used.
+    """
+    markers = []
+    offset = 0
+    for line in text.split("\n"):
+        if "*" in line:
+            bold = set()
+            pos = 0
+            while True:
+                start = line.find("**", pos)
+                if start < 0:
+                    break
+                end = line.find("**", start + 3)
+                if end < 0:
+                    break
+                markers.append((offset + start, 2, "<strong>"))
+                markers.append((offset + end, 2, "</strong>"))
+                bold.update((start, start + 1, end, end + 1))
+                pos = end + 2
+
+            stars = []
+            pos = line.find("*")
+            while pos >= 0:
+                if pos not in bold:
+                    stars.append(pos)
+                pos = line.find("*", pos + 1)
+
+            i = 0
+            while i + 1 < len(stars):
+                j = i + 1 if stars[i + 1] > stars[i] + 1 else i + 2
+                if j >= len(stars):
+                    break
+                markers.append((offset + stars[i], 1, "<em>"))
+                markers.append((offset + stars[j], 1, "</em>"))
+                i = j + 1
+        offset += len(line) + 1
+    return markers
+
+
+def url_scanner(text):
+    """Return url_end(pos), the end of the URL_RE match at pos (pos itself if
+    there is none), for positions that never decrease
+
+    Every position inside one run of URL characters ends where the run
+    does, so the run is scanned once however many "(" open into it.
+    """
+    run_end = -1
+
+    def url_end(pos):
+        nonlocal run_end
+        if pos >= run_end:
+            match = URL_RE.match(text, pos)
+            run_end = match.end() if match else pos
+        return run_end
+
+    return url_end
+
+
+def find_images(text):
+    """Locate ![alt](url) and ![alt](url){attrs} images, left to right"""
+    images = []
+    url_end = url_scanner(text)
+    brace = -1
+    pos = 0
+    while True:
+        start = text.find("![", pos)
+        if start < 0:
+            break
+
+        # Every later "![" before the first "]" shares that "]" and the
+        # (url){attrs} after it, so if they make no image the scan resumes
+        # past it rather than trying each of them
+        close = text.find("]", start + 2)
+        if close < 0:
+            break
+        pos = close
+        url = url_end(close + 2)
+        if (
+            text[close + 1 : close + 2] != "("
+            or url == close + 2
+            or text[url : url + 1] != ")"
+        ):
+            continue
+
+        end = url + 1
+        width = None
+        if text[end : end + 1] == "{":
+            # Likewise the first "}" is only searched for again once the
+            # scan has passed it
+            if brace <= end:
+                brace = text.find("}", end + 1)
+                if brace < 0:
+                    brace = len(text)
+            if brace == len(text):
+                continue
+            width = find_width(text, end + 1, brace)
+            end = brace + 1
+
+        images.append(
+            {
+                "type": "image",
+                "start": start,
+                "end": end,
+                "alt": (start + 2, close),
+                "url": (close + 2, url),
+                "width": width,
+            }
+        )
+        pos = end
+    return images
+
+
+def find_width(text, start, end):
+    """Return the digits of the last width=N% attribute in text[start:end]"""
+    pos = text.rfind("width=", start, end)
+    while pos >= 0:
+        digits = DIGITS_RE.match(text, pos + 6, end)
+        if digits and text[digits.end() : digits.end() + 1] == "%":
+            return digits.group(0)
+        pos = text.rfind("width=", start, pos)
+    return None
+
+
+def parse_inline(text):
+    """Build the inline node list (text ranges, images, links) for text"""
+    if "[" not in text:
+        return [{"type": "text", "start": 0, "end": len(text)}]
+
+    images = find_images(text)
+    image_starts = [img["start"] for img in images]
+
+    def add_range(nodes, start, end):
+        i = bisect_left(image_starts, start)
+        while i < len(images) and images[i]["start"] < end:
+            if images[i]["start"] > start:
+                nodes.append({"type": "text", "start": start, "end": images[i]["start"]})
+            nodes.append(images[i])
+            start = images[i]["end"]
+            i += 1
+        if end > start:
+            nodes.append({"type": "text", "start": start, "end": end})
+
+    def image_at(pos):
+        i = bisect_right(image_starts, pos) - 1
+        if i >= 0 and images[i]["end"] > pos:
+            return images[i]
+        return None
+
+    url_end = url_scanner(text)
+
+    def link_url(close):
+        end = url_end(close + 2)
+        if (
+            text[close + 1 : close + 2] != "("
+            or end == close + 2
+            or text[end : end + 1] != ")"
+        ):
+            return None
+        i = bisect_left(image_starts, close + 2)
+        if i < len(images) and images[i]["start"] < end:
+            return None
+        return end
+
+    nodes = []
+    pos = search = 0
+    close = -1
+    while True:
+        start = text.find("[", search)
+        if start < 0:
+            break
+        inside = image_at(start)
+        if inside:
+            search = inside["end"]
+            continue
+        search = start + 1
+
+        # First "]" after the bracket that is not part of an image; like
+        # the "]", its (url) is shared by every "[" before it
+        if close <= start:
+            close = text.find("]", start + 1)
+            while close >= 0 and image_at(close):
+                close = text.find("]", image_at(close)["end"])
+            if close < 0:
+                break
+            url = link_url(close)
+        if url is None:
+            # No "[" before the "]" can open a link either
+            search = close + 1
+            continue
+        if close == start + 1:
+            continue
+
+        add_range(nodes, pos, start)
+        children = []
+        add_range(children, start + 1, close)
+        nodes.append({"type": "link", "children": children, "url": (close + 2, url)})
+        pos = search = url + 1
+
+    add_range(nodes, pos, len(text))
+    return nodes
+
+
+def render_inline(text, codes, code_index, newline, plain=False):
+    """Serialize one heading or run of text lines to HTML in a single walk
+
+    With plain, emphasis, links and images are left as written.
+    """
+    specials = emphasis_markers(text) if "*" in text and not plain else []
+
+    if INLINE_CODE_MARK in text:
+        pos = text.find(INLINE_CODE_MARK)
+        while pos >= 0:
+            specials.append((pos, 1, codes[code_index]))
+            code_index += 1
+            pos = text.find(INLINE_CODE_MARK, pos + 1)
+
+    if newline != "\n" and "\n" in text:
+        pos = text.find("\n")
+        while pos >= 0:
+            specials.append((pos, 1, newline))
+            pos = text.find("\n", pos + 1)
+
+    specials.sort()
+    positions = [sp[0] for sp in specials]
+
+    def emit(start, end):
+        out = []
+        k = bisect_left(positions, start)
+        while k < len(specials) and positions[k] < end:
+            pos, length, replacement = specials[k]
+            out.append(text[start:pos])
+            out.append(replacement)
+            start = pos + length
+            k += 1
+        out.append(text[start:end])
+        return "".join(out)
+
+    def render(nodes):
+        out = []
+        for node in nodes:
+            if node["type"] == "text":
+                out.append(emit(node["start"], node["end"]))
+            elif node["type"] == "image":
+                style = f' style="width: {node["width"]}%;"' if node["width"] else ""
+                out.append(
+                    f'<img src="{emit(*node["url"])}" alt="{emit(*node["alt"])}" '
+                    f'class="img-fluid"{style} loading="lazy">'
+                )
+            else:
+                out.append(
+                    f'<a href="{emit(*node["url"])}">{render(node["children"])}</a>'
+                )
+        return "".join(out)
+
+    if plain:
+        return emit(0, len(text))
+    return render(parse_inline(text))
+
+
+def render_code_block(block):
+    """Render a fenced code block as an escaped <pre><code> element"""
+    if block["lang"]:
+        return f'<pre><code class="language-{block["lang"]}">{escape(block["content"])}</code></pre>'
+    return f"<pre><code>{escape(block['content'])}</code></pre>"
+
+
+def heading_slug(text, slugs):
+    """Return a unique anchor slug for a heading's plain text and reserve it
+
+    slugs maps every reserved slug to the next -N suffix to try when it is
+    wanted again, so repeated headings don't retry all the earlier suffixes.
+    """
+    base = re.sub(r"[^a-z0-9-]", "", text.lower().replace(" ", "-")) or "section"
+    slug = base
+    if base in slugs:
+        n = slugs[base]
+        slug = f"{base}-{n}"
+        while slug in slugs:
+            n += 1
+            slug = f"{base}-{n}"
+        slugs[base] = n + 1
+    slugs[slug] = 1
+    return slug
+
+
+def render_paragraph(lines, codes, headings=None, slugs=None, plain=False):
+    """Render one blank-line separated block of lines, without inline
+    markup if plain"""
+    first = lines[0]
+    raw = first["type"] != "text" or first["text"].lstrip().startswith("<h")
+    newline = "\n" if raw else "<br>"
+
+    if first["type"] == "text":
+        lines[0] = {**first, "text": first["text"].lstrip()}
+    if lines[-1]["type"] == "text":
+        lines[-1] = {**lines[-1], "text": lines[-1]["text"].rstrip()}
+
+    out = []
+    run = []
+    for line in lines + [None]:
+        if line is not None and line["type"] == "text":
+            run.append(line)
+            continue
+        if run:
+            text = "\n".join(l["text"] for l in run)
+            out.append(render_inline(text, codes, run[0]["code_index"], newline, plain))
+            run = []
+        if line is None:
+            break
+        if line["type"] == "heading":
+            level = line["level"]
+            content = render_inline(
+                line["text"], codes, line["code_index"], newline, plain
             )
+            if headings is None:
+                out.append(f"<h{level}>{content}</h{level}>")
+                continue
+            plain_text = sub_tags(TAG_RE, "", content).strip()
+            slug = heading_slug(plain_text, slugs)
+            headings.append(
+                {
+                    "level": level,
+                    "text": content,
+                    "plain": plain_text,
+                    "slug": slug,
+                    "position": len(headings),
+                }
+            )
+            out.append(f'<h{level} id="{slug}">{content}</h{level}>')
         else:
-            content = code[3:-3]
-            code_html = f"<pre><code>{escape(content)}</code></pre>"
-        html = html.replace(f"__CODE_BLOCK_{i}__", code_html)
+            out.append(render_code_block(line))
+
+    html = newline.join(out)
+    return html if raw else f"<p>{html}</p>"
+
+
+def md_to_html(
+    md_content, headings=None, time_limit=RENDER_TIME_LIMIT, name="document"
+):
+    """Convert markdown to simple HTML
+
+    If a headings list is passed, every heading is given a unique id and
+    recorded in it as {"level", "text", "plain", "slug", "position"}, in
+    document order: "text" is the heading's HTML and "plain" that HTML with
+    its tags stripped.
 
-    return html
+    Rendering is linear in the length of the markdown. As a backstop, once
+    it has taken time_limit seconds the remaining paragraphs are rendered
+    without inline markup and a warning naming the document is printed.
+    """
+    with trace_span("md_to_html", chars=len(md_content)):
+        paragraphs, codes = parse_blocks(md_content)
+        slugs = {}
+        deadline = time.perf_counter() + time_limit
+        out = []
+        for n, lines in enumerate(paragraphs):
+            if time.perf_counter() > deadline:
+                print(
+                    f"⚠️  {name}: rendering took over {time_limit:g}s, leaving "
+                    f"{len(paragraphs) - n} of {len(paragraphs)} paragraphs as plain text"
+                )
+                out.extend(
+                    render_paragraph(lines, codes, headings, slugs, plain=True)
+                    for lines in paragraphs[n:]
+                )
+                break
+            out.append(render_paragraph(lines, codes, headings, slugs))
+        return "\n".join(out)
 
 
-def copy_assets(base_dir, output_dir):
-    """Copy CSS, JS, images, and CV"""
+def collect_assets(base_dir, output_dir):
+    """List (source, destination) pairs for CSS, profile image, CV and post images"""
     output = Path(output_dir)
     base = Path(base_dir)
+    assets = []
 
     css_src_simple = base / "styles_simple.css"
     css_src = base / "styles.css"
     css_dst = output / "styles.css"
 
     if css_src_simple.exists():
-        shutil.copy2(css_src_simple, css_dst)
+        assets.append((css_src_simple, css_dst))
     elif css_src.exists():
-        shutil.copy2(css_src, css_dst)
+        assets.append((css_src, css_dst))
 
     profile_src = base / "profile.jpg"
-    profile_dst = output / "profile.jpg"
     if profile_src.exists():
-        shutil.copy2(profile_src, profile_dst)
+        assets.append((profile_src, output / "profile.jpg"))
 
     cv_src = base / "cv" / "ThomasBush_CV.pdf"
-    cv_dst_dir = output / "cv"
-    cv_dst_dir.mkdir(exist_ok=True)
     if cv_src.exists():
-        shutil.copy2(cv_src, cv_dst_dir / "ThomasBush_CV.pdf")
+        assets.append((cv_src, output / "cv" / "ThomasBush_CV.pdf"))
 
     for section in ["research", "books"]:
         section_src = base / section
@@ -245,56 +900,239 @@ def copy_assets(base_dir, output_dir):
             if post_dir.is_dir() and (post_dir / "images").exists():
                 img_src = post_dir / "images"
                 img_dst = output / f"{section}_{post_dir.name}_images"
-                img_dst.mkdir(parents=True, exist_ok=True)
                 for img in img_src.iterdir():
                     if img.is_file():
-                        shutil.copy2(img, img_dst / img.name)
+                        assets.append((img, img_dst / img.name))
 
+    return assets
 
-def get_all_posts(base_dir):
-    """Get all posts from research and books directories"""
-    posts = []
 
+def publish_asset(src, dst, mode="copy"):
+    """Publish src at dst as a hardlink, reflink or copy, falling back in that order"""
+    if dst.exists() or dst.is_symlink():
+        dst.unlink()
+
+    if mode == "hardlink":
+        try:
+            os.link(src, dst)
+            return
+        except OSError:
+            pass
+
+    if mode in ("hardlink", "reflink") and fcntl is not None:
+        try:
+            with open(src, "rb") as fsrc, open(dst, "wb") as fdst:
+                fcntl.ioctl(fdst.fileno(), FICLONE, fsrc.fileno())
+            shutil.copystat(src, dst)
+            return
+        except OSError:
+            pass
+
+    shutil.copy2(src, dst)
+
+
+def copy_assets(base_dir, output_dir, assets=None, mode="copy"):
+    """Copy CSS, JS, images, and CV (or only the given asset pairs)"""
+    (Path(output_dir) / "cv").mkdir(exist_ok=True)
+
+    if assets is None:
+        assets = collect_assets(base_dir, output_dir)
+
+    for src, dst in assets:
+        dst.parent.mkdir(parents=True, exist_ok=True)
+        publish_asset(src, dst, mode)
+
+
+def read_image_size(path):
+    """Read (width, height) from a PNG, GIF, WebP or JPEG header without
+    decoding the image; None for other or malformed files"""
+    with open(path, "rb") as f:
+        head = f.read(32)
+        if head.startswith(b"\x89PNG\r\n\x1a\n") and head[12:16] == b"IHDR":
+            return (
+                int.from_bytes(head[16:20], "big"),
+                int.from_bytes(head[20:24], "big"),
+            )
+        if head[:6] in (b"GIF87a", b"GIF89a"):
+            return (
+                int.from_bytes(head[6:8], "little"),
+                int.from_bytes(head[8:10], "little"),
+            )
+        if head[:4] == b"RIFF" and head[8:12] == b"WEBP" and len(head) >= 30:
+            chunk = head[12:16]
+            if chunk == b"VP8 ":
+                return (
+                    int.from_bytes(head[26:28], "little") & 0x3FFF,
+                    int.from_bytes(head[28:30], "little") & 0x3FFF,
+                )
+            if chunk == b"VP8L":
+                bits = int.from_bytes(head[21:25], "little")
+                return (bits & 0x3FFF) + 1, ((bits >> 14) & 0x3FFF) + 1
+            if chunk == b"VP8X":
+                return (
+                    int.from_bytes(head[24:27], "little") + 1,
+                    int.from_bytes(head[27:30], "little") + 1,
+                )
+            return None
+        if head[:2] != b"\xff\xd8":
+            return None
+
+        # JPEG: walk the marker segments up to the start-of-frame header
+        f.seek(2)
+        while True:
+            marker = f.read(2)
+            if len(marker) < 2 or marker[0] != 0xFF:
+                return None
+            while marker[1] == 0xFF:  # fill bytes before a marker
+                marker = marker[1:] + f.read(1)
+            code = marker[1]
+            if code in (0x01, 0xD8) or 0xD0 <= code <= 0xD7:
+                continue  # markers without a length
+            length = int.from_bytes(f.read(2), "big")
+            if 0xC0 <= code <= 0xCF and code not in (0xC4, 0xC8, 0xCC):
+                frame = f.read(5)
+                if len(frame) < 5:
+                    return None
+                return (
+                    int.from_bytes(frame[3:5], "big"),
+                    int.from_bytes(frame[1:3], "big"),
+                )
+            if code == 0xD9 or length < 2:
+                return None
+            f.seek(length - 2, 1)
+
+
+def load_frontmatter_cache(cache_path):
+    """Load the parsed-frontmatter cache, which maps each post file to its
+    [size, mtime_ns, inode, digest or None, frontmatter, body offset]"""
+    try:
+        with open(cache_path, "r", encoding="utf-8") as f:
+            cache = json.load(f)
+    except (OSError, ValueError):
+        return {}
+    if cache.get("version") != FRONTMATTER_CACHE_VERSION:
+        return {}
+    return cache.get("posts", {})
+
+
+def save_frontmatter_cache(cache_path, entries):
+    """Write the parsed-frontmatter cache, if the directory is writable"""
+    try:
+        with open(cache_path, "w", encoding="utf-8") as f:
+            json.dump(
+                {"version": FRONTMATTER_CACHE_VERSION, "posts": entries},
+                f,
+                ensure_ascii=False,
+                separators=(",", ":"),
+                sort_keys=True,
+            )
+    except OSError:
+        pass
+
+
+def cached_frontmatter(path, old_entries, new_entries, key, digest=False):
+    """(frontmatter, body offset, digest) of a post file
+
+    The previous entry is reused while the file's size, mtime and inode are
+    unchanged. Otherwise only the frontmatter is read again, unless digest
+    is set: the whole file is hashed then anyway, and a file whose contents
+    did not change keeps its parsed frontmatter. The digest is None unless
+    it was asked for or is already cached.
+    """
+    stat = os.stat(path)
+    key_stat = [stat.st_size, stat.st_mtime_ns, stat.st_ino]
+    cached = old_entries.get(key)
+    if cached and cached[:3] == key_stat:
+        entry = cached
+        if digest and entry[3] is None:
+            entry = [*key_stat, hash_file(path), *entry[4:]]
+    else:
+        file_digest = hash_file(path) if digest else None
+        if file_digest and cached and cached[3] == file_digest:
+            entry = [*key_stat, *cached[3:]]
+        else:
+            frontmatter, body_offset = read_frontmatter(path)
+            entry = [*key_stat, file_digest, frontmatter, body_offset]
+    new_entries[key] = entry
+    return entry[4], entry[5], entry[3]
+
+
+def post_files(base_dir):
+    """(section, path) of every post's index.qmd, in directory order, which
+    is the order of posts sharing a date"""
     for section in ["research", "books"]:
         section_dir = Path(base_dir) / section
         if not section_dir.exists():
             continue
-
         for post_dir in section_dir.iterdir():
-            if post_dir.is_dir():
-                post_file = post_dir / "index.qmd"
-                if post_file.exists():
-                    with open(post_file, "r", encoding="utf-8") as f:
-                        content = f.read()
-                        frontmatter, body = parse_frontmatter(content)
-
-                        if frontmatter.get("title", "").lower() in [
-                            section,
-                            f"{section.capitalize()}",
-                            "book reviews",
-                        ]:
-                            continue
-
-                        posts.append(
-                            {
-                                "section": section,
-                                "slug": post_dir.name,
-                                "path": post_file,
-                                "frontmatter": frontmatter,
-                                "body": body,
-                                "date": frontmatter.get("date", "2000-01-01"),
-                                "title": frontmatter.get("title", post_dir.name),
-                                "categories": frontmatter.get("categories", []),
-                                "description": frontmatter.get("description", ""),
-                            }
-                        )
+            post_file = post_dir / "index.qmd"
+            if post_dir.is_dir() and post_file.exists():
+                yield section, post_file
+
+
+def post_entry(section, post_file, frontmatter, body_offset, digest=None):
+    """The post dict of a section's post_dir/index.qmd, from its frontmatter"""
+    slug = Path(post_file).parent.name
+    return {
+        "section": section,
+        "slug": slug,
+        "path": post_file,
+        "frontmatter": frontmatter,
+        "body_offset": body_offset,
+        "digest": digest,
+        "date": frontmatter.get("date", "2000-01-01"),
+        "title": frontmatter.get("title", slug),
+        "categories": frontmatter.get("categories", []),
+        "description": frontmatter.get("description", ""),
+    }
+
+
+def get_all_posts(base_dir, digests=False):
+    """Get all posts from research and books directories
+
+    Only each post's frontmatter is read, and only when it is not in the
+    frontmatter cache already; the body stays on disk until post_body asks
+    for it. With digests, every post also gets the digest of its file (see
+    cached_frontmatter).
+    """
+    posts = []
+    cache_path = Path(base_dir) / FRONTMATTER_CACHE_NAME
+    old_entries = load_frontmatter_cache(cache_path)
+    new_entries = {}
+
+    for section, post_file in post_files(base_dir):
+        key = post_file.relative_to(base_dir).as_posix()
+        frontmatter, body_offset, digest = cached_frontmatter(
+            post_file, old_entries, new_entries, key, digests
+        )
+
+        if frontmatter.get("title", "").lower() in [
+            section,
+            f"{section.capitalize()}",
+            "book reviews",
+        ]:
+            continue
+
+        posts.append(post_entry(section, post_file, frontmatter, body_offset, digest))
+
+    if new_entries != old_entries:
+        save_frontmatter_cache(cache_path, new_entries)
 
     posts.sort(key=lambda x: x["date"], reverse=True)
     return posts
 
 
-def generate_html_layout(title, content, page_type="post"):
-    """Generate HTML page with Catppuccin styling"""
+def post_body(post):
+    """Read a post's markdown body from its file"""
+    return read_body(post["path"], post["body_offset"])
+
+
+def render_page_shell(title, content, page_type="post"):
+    """Format the full page shell with Catppuccin styling around title and content
+
+    Page styles live in the shared styles.css and the MathJax setup in
+    mathjax-config.js, so each page only carries its own content.
+    """
 
     nav_links = [
         ("index.html", "Home"),
@@ -314,59 +1152,136 @@ def generate_html_layout(title, content, page_type="post"):
     if page_type in ["home", "listing"]:
         search_html = """\n        <div class="search-box">\n          <input type="text" id="search-input" placeholder="Search posts..." />\n        </div>\n        """
 
-    return f"""<!DOCTYPE html>\n<html lang="en" data-theme="dark">\n<head>\n    <meta charset="UTF-8">\n    <meta name="viewport" content="width=device-width, initial-scale=1.0">\n    <title>{title}</title>\n    <link rel="stylesheet" href="styles.css">\n    <style>\n        .search-box {{\n            margin: 2rem 0;\n            text-align: center;\n        }}\n        .search-box input {{\n            padding: 0.75rem 1rem;\n            border: 1px solid #45475a;\n            background: #181825;\n            color: #cdd6f4;\n            border-radius: 6px;\n            font-family: inherit;\n            width: 100%;\n            max-width: 500px;\n            font-size: 1rem;\n        }}\n        .search-box input:focus {{\n            outline: none;\n            border-color: #89dceb;\n            box-shadow: 0 0 0 2px rgba(137, 220, 235, 0.2);\n        }}\n        .post-item {{\n            display: flex;\n            flex-direction: column;\n            margin-bottom: 2.5rem;\n            padding-bottom: 1.5rem;\n            border-bottom: 1px solid #313244;\n        }}\n        .post-item:last-child {{\n            border-bottom: none;\n        }}\n        .post-title {{\n            margin-bottom: 0.5rem;\n        }}\n        .post-title a {{\n            color: #89b4fa;\n            font-size: 1.5rem;\n            font-weight: 600;\n            text-decoration: none;\n        }}\n        .post-title a:hover {{\n            color: #94e2d5;\n            text-decoration: underline;\n        }}\n        .post-meta {{\n            color: #a6adc8;\n            font-size: 0.9rem;\n            margin-bottom: 0.75rem;\n        }}\n        .post-categories {{\n            margin-bottom: 0.5rem;\n        }}\n        .post-categories span {{\n            display: inline-block;\n            background: #45475a;\n            color: #bac2de;\n            padding: 0.25rem 0.5rem;\n            border-radius: 4px;\n            font-size: 0.8rem;\n            margin-right: 0.5rem;\n        }}\n        .post-description {{\n            color: #cdd6f4;\n            margin-top: 0.75rem;\n            line-height: 1.5;\n        }}\n        nav {{\n            background: #181825;\n            padding: 1rem 0;\n            margin-bottom: 2rem;\n            border-bottom: 1px solid #313244;\n        }}\n        nav ul {{\n            list-style: none;\n            display: flex;\n            gap: 2rem;\n            justify-content: center;\n            margin: 0;\n            padding: 0;\n        }}\n        nav a {{\n            color: #cdd6f4;\n            text-decoration: none;\n            font-weight: 500;\n            padding: 0.5rem 1rem;\n            border-radius: 4px;\n            transition: all 0.2s ease;\n        }}\n        nav a:hover {{\n            background: #313244;\n            color: #89dceb;\n        }}\n        .container {{\n            max-width: 900px;\n            margin: 0 auto;\n            padding: 0 1rem;\n        }}\n        .about-profile {{\n            text-align: center;\n            margin-bottom: 2rem;\n        }}\n        .about-profile img {{\n            border-radius: 50%;\n            width: 200px;\n            height: 200px;\n            object-fit: cover;\n            border: 3px solid #45475a;\n            box-shadow: 0 4px 12px rgba(0, 0, 0, 0.3);\n        }}\n        .social-links {{\n            text-align: center;\n            margin-top: 2rem;\n        }}\n        .social-links a {{\n            display: inline-block;\n            margin: 0 1rem;\n            color: #89dceb;\n            text-decoration: none;\n            font-weight: 500;\n        }}\n        .social-links a:hover {{\n            color: #94e2d5;\n        }}\n        pre {{\n            background: #181825;\n            border: 1px solid #313244;\n            border-radius: 6px;\n            padding: 1rem;\n            overflow-x: auto;\n            margin-bottom: 1.5rem;\n        }}\n        code {{\n            background: #313244;\n            padding: 0.2rem 0.4rem;\n            border-radius: 3px;\n            font-family: \'JetBrains Mono\', monospace;\n            font-size: 0.9rem;\n            color: #a6e3a1;\n        }}\n        pre code {{\n            background: none;\n            padding: 0;\n            color: #cdd6f4;\n        }}\n        h1, h2, h3, h4, h5, h6 {{\n            color: #b4befe;\n            margin-top: 2rem;\n            margin-bottom: 1rem;\n            font-weight: 600;\n        }}\n        h1 {{ font-size: 2.2rem; }}\n        h2 {{ font-size: 1.8rem; }}\n        h3 {{ font-size: 1.5rem; }}\n        a {{\n            color: #89dceb;\n        }}\n        a:hover {{\n            color: #94e2d5;\n            text-decoration: underline;\n        }}\n        body {{\n            background: #1e1e2e;\n            color: #cdd6f4;\n            font-family: \'JetBrains Mono\', \'Monaco\', \'Consolas\', monospace;\n            line-height: 1.6;\n            margin: 0;\n            padding: 0;\n        }}\n        .hidden {{\n            display: none !important;\n        }}\n        .toc li {{
-            margin: 0.25rem 0;
-            line-height: 1.3;
-        }}
-
-        .toc ul {{
-            list-style: none;
-            padding: 0;
-            margin: 0;
-        }}
-
-        .toc-title {{
-            color: #89b4fa;
-            font-size: 0.95rem;
-            margin-bottom: 0.5rem;
-            font-weight: 600;
-        }}
-
-        .toc {{
-            background: #181825;
-            border: 1px solid #313244;
-            border-radius: 6px;
-            padding: 0.75rem 1rem;
-            max-width: 100%;
-            overflow: hidden;
-        }}
-
-        .toc-container {{
-            margin-bottom: 1.5rem;
-            max-width: 100%;
-            overflow-x: hidden;
-        }}
-
-        article h1 {{\n            color: #b4befe;\n            border-bottom: 2px solid #313244;\n            padding-bottom: 0.5rem;\n            margin-bottom: 1.5rem;\n        }}\n    </style>\n</head>\n<body>\n    <nav>\n        <div class="container">\n            <ul>\n                {nav_html}\n            </ul>\n        </div>\n    </nav>\n    \n    <div class="container">\n        {search_html}\n        <main>\n            {content}\n        </main>\n    </div>\n    \n    <script>
-    MathJax = {{
-        tex: {{
-            inlineMath: [['$', '$'], ['\\(', '\\)']],
-            displayMath: [['$$', '$$'], ['\\[', '\\]']]
-        }},
-        svg: {{
-            fontCache: 'global'
-        }}
-    }};
-    </script>
+    return f"""<!DOCTYPE html>
+<html lang="en" data-theme="dark">
+<head>
+    <meta charset="UTF-8">
+    <meta name="viewport" content="width=device-width, initial-scale=1.0">
+    <title>{title}</title>
+    <link rel="stylesheet" href="styles.css">
+</head>
+<body>
+    <nav>
+        <div class="container">
+            <ul>
+                {nav_html}
+            </ul>
+        </div>
+    </nav>
+    
+    <div class="container">
+        {search_html}
+        <main>
+            {content}
+        </main>
+    </div>
+    
+    <script src="mathjax-config.js"></script>
     <script type="text/javascript" id="MathJax-script" async
       src="https://cdn.jsdelivr.net/npm/mathjax@3/es5/tex-svg.js">
     </script>
-    <script src="search.js"></script>\n</body>\n</html>\n"""
+    <script src="search.js"></script>
+</body>
+</html>
+"""
+
+
+TITLE_SLOT = "\x00title\x00"
+CONTENT_SLOT = "\x00content\x00"
+
+
+@lru_cache(maxsize=None)
+def compile_layout(page_type):
+    """Split the page shell for page_type into fixed (head, middle, tail) segments"""
+    shell = render_page_shell(TITLE_SLOT, CONTENT_SLOT, page_type)
+    head, rest = shell.split(TITLE_SLOT)
+    middle, tail = rest.split(CONTENT_SLOT)
+    return head, middle, tail
+
+
+def generate_html_layout(title, content, page_type="post"):
+    """Generate HTML page by joining the compiled shell with title and content"""
+    head, middle, tail = compile_layout(page_type)
+    return "".join((head, title, middle, content, tail))
+
+
+IMG_SRC_RE = re.compile(r'<img src="([^"]+)"[^>]*>')
+# Rendered image widths: post images fill the 900px content column and
+# listing covers are at most 300px wide
+POST_IMAGE_SIZES = "(max-width: 900px) 100vw, 900px"
+COVER_IMAGE_SIZES = "(max-width: 768px) 100vw, 300px"
+
+
+def add_image_dimensions(html, image_sizes):
+    """Give every <img> in html with a known source its intrinsic width and
+    height, so the browser reserves its space before it loads
+
+    The sizes are those of the published files when the page was built; a
+    page built before optimize_images.py resized an image keeps its old
+    size, of the same aspect ratio, until the next build.
+    """
+    if not image_sizes:
+        return html
+
+    def add(match):
+        size = image_sizes.get(match.group(1))
+        if not size:
+            return match.group(0)
+        end = match.end(1) + 1
+        tag = match.group(0)
+        offset = end - match.start()
+        return f'{tag[:offset]} width="{size[0]}" height="{size[1]}"{tag[offset:]}'
+
+    return sub_tags(IMG_SRC_RE, add, html)
+
+
+def responsive_img(tag, variants, sizes=POST_IMAGE_SIZES):
+    """Wrap an <img> tag in a <picture> offering its responsive variants"""
+    sources = []
+    for fmt in dict.fromkeys(v["format"] for v in variants):
+        srcset = ", ".join(
+            f'{v["src"]} {v["width"]}w' for v in variants if v["format"] == fmt
+        )
+        sources.append(f'<source type="image/{fmt}" srcset="{srcset}" sizes="{sizes}">')
+    return f'<picture>{"".join(sources)}{tag}</picture>'
+
+
+def add_responsive_images(html, variants, sizes=POST_IMAGE_SIZES):
+    """Wrap every <img> in html whose source has variants in a <picture>"""
+    if not variants:
+        return html
+    return sub_tags(
+        IMG_SRC_RE,
+        lambda m: responsive_img(m.group(0), variants[m.group(1)], sizes)
+        if m.group(1) in variants
+        else m.group(0),
+        html,
+    )
 
 
 def generate_post_page(post, output_dir):
     """Generate individual post page"""
-    html_content = md_to_html(post["body"])
+    output_path = Path(output_dir) / f"{post['section']}_{post['slug']}.html"
+    with trace_span("generate_post_page", page=output_path.name):
+        with open(output_path, "w", encoding="utf-8") as f:
+            f.write(render_post_page(post))
+
+
+def generate_post_page_traced(post, output_dir):
+    """generate_post_page in a worker process, returning the trace events
+    it recorded"""
+    global trace_events
+    trace_events = []
+    generate_post_page(post, output_dir)
+    events, trace_events = trace_events, None
+    return events
+
+
+def render_post_page(post):
+    """Render a post's full HTML page"""
+    toc_enabled = post["frontmatter"].get("toc", False)
+    headings = [] if toc_enabled else None
+    html_content = md_to_html(post_body(post), headings, name=str(post["path"]))
 
     html_content = re.sub(
         r'src="images/([^"]+)"',
@@ -375,40 +1290,39 @@ def generate_post_page(post, output_dir):
     )
 
     cover_image_html = ""
-    if "image" in post["frontmatter"]:
-        img_path = post["frontmatter"]["image"]
-        if img_path.startswith("images/"):
-            img_path = f"{post['section']}_{post['slug']}_images/{img_path[7:]}"
+    img_path = post_cover_path(post)
+    if img_path:
         cover_image_html = (
             f'<div class="post-cover"><img src="{img_path}" alt="Cover image"></div>'
         )
 
-    # Generate TOC if enabled
+    sizes = post.get("image_sizes")
+    html_content = add_image_dimensions(html_content, sizes)
+    cover_image_html = add_image_dimensions(cover_image_html, sizes)
+
+    variants = post.get("image_variants")
+    html_content = add_responsive_images(html_content, variants)
+    cover_image_html = add_responsive_images(cover_image_html, variants)
+
+    # Generate TOC if enabled, from the heading index built while rendering
     toc_html = ""
-    if post["frontmatter"].get("toc", False):
-        headers = re.findall(r"<h([1-4])>([^<]+)</h\1>", html_content)
-        headers = [(level, text.strip()) for level, text in headers]
-        post_title = post["title"]
-        headers = [h for h in headers if h[1].lower() != post_title.lower()]
+    if toc_enabled:
+        post_title = post["title"].lower()
+        headers = [
+            h
+            for h in headings
+            if h["level"] <= 4 and h["plain"].lower() != post_title
+        ]
         if headers:
             toc_title = post["frontmatter"].get("toc-title", "Table of Contents")
             toc_location = post["frontmatter"].get("toc-location", "right")
             toc_items = []
-            for level, text in headers:
-                anchor = re.sub(r"[^a-z0-9-]", "", text.lower().replace(" ", "-"))
-                indent = max(0, int(level) - 2) * 1.25
+            for h in headers:
+                indent = max(0, h["level"] - 2) * 1.25
                 toc_items.append(
-                    f'<li class="toc-level-{level}" style="margin-left: {indent}rem"><a href="#{anchor}">{text}</a></li>'
+                    f'<li class="toc-level-{h["level"]}" style="margin-left: {indent}rem"><a href="#{h["slug"]}">{h["plain"]}</a></li>'
                 )
             toc_html = f"""<aside class="toc-container" data-location="{toc_location}"><div class="toc"><h2 class="toc-title">{toc_title}</h2><ul>{"".join(toc_items)}</ul></div></aside>"""
-            for level, text in headers:
-                anchor = re.sub(r"[^a-z0-9-]", "", text.lower().replace(" ", "-"))
-                html_content = re.sub(
-                    rf"<h{level}>{re.escape(text)}</h{level}>",
-                    rf'<h{level} id="{anchor}">{text}</h{level}>',
-                    html_content,
-                    count=1,
-                )
 
     cats_html = ", ".join(post["categories"]) if post["categories"] else ""
     cats_display = (
@@ -428,20 +1342,127 @@ def generate_post_page(post, output_dir):
     </article>
     """
 
-    html = generate_html_layout(
+    return generate_html_layout(
         f"{post['title']} - Thomas W. Bush", page_content, "post"
     )
 
-    output_path = Path(output_dir) / f"{post['section']}_{post['slug']}.html"
-    with open(output_path, "w", encoding="utf-8") as f:
-        f.write(html)
+
+def render_posts(posts, output_dir, jobs=1):
+    """Render post pages, spreading them over a process pool when jobs > 1"""
+    if jobs <= 1 or len(posts) < 2:
+        for post in posts:
+            generate_post_page(post, output_dir)
+        return
+
+    # Each post writes its own file, so the output does not depend on
+    # scheduling order; chunking keeps pickling overhead low on big corpora
+    chunksize = max(1, len(posts) // (jobs * 4))
+    worker = generate_post_page if trace_events is None else generate_post_page_traced
+    with ProcessPoolExecutor(max_workers=jobs) as pool:
+        for events in pool.map(
+            worker, posts, [output_dir] * len(posts), chunksize=chunksize
+        ):
+            if events:
+                trace_events.extend(events)
 
 
 # Rest of functions to add...
 
 
-def generate_listing(title, posts, output_path, page_type="listing"):
-    """Generate a listing page"""
+def listing_page_path(output_path, page):
+    """Output path of page `page` of a listing (page 1 is the listing itself)"""
+    output_path = Path(output_path)
+    if page == 1:
+        return output_path
+    return output_path.with_name(f"{output_path.stem}-{page}.html")
+
+
+def paginate(posts, page_size):
+    """Split posts into pages of page_size (always at least one page)"""
+    if page_size <= 0:
+        return [posts]
+    return [posts[i : i + page_size] for i in range(0, len(posts), page_size)] or [[]]
+
+
+def pagination_html(page, page_urls):
+    """Render the prev/next navigation of a paginated listing"""
+    if len(page_urls) < 2:
+        return ""
+    prev_html = ""
+    if page > 1:
+        prev_html = f'<a class="pagination-prev" href="{page_urls[page - 2]}" rel="prev">&larr; Newer posts</a>'
+    next_html = ""
+    if page < len(page_urls):
+        next_html = f'<a class="pagination-next" href="{page_urls[page]}" rel="next">Older posts &rarr;</a>'
+    return f"""
+    <nav class="pagination" aria-label="Pagination">
+        {prev_html}
+        <span class="pagination-current">Page {page} of {len(page_urls)}</span>
+        {next_html}
+    </nav>
+    """
+
+
+def listing_pages(posts, page_size=LISTING_PAGE_SIZE):
+    """Plan every listing page as (file name, generate_listing arguments)"""
+    research_posts = [p for p in posts if p["section"] == "research"]
+    books_posts = [p for p in posts if p["section"] == "books"]
+    listings = [
+        ("Recent Posts", posts, "index.html", "home", None),
+        ("Research", research_posts, "research.html", "listing", "research"),
+        ("Books", books_posts, "books.html", "listing", "books"),
+    ]
+    pages = []
+    for title, listing_posts, name, page_type, section in listings:
+        chunks = paginate(listing_posts, page_size)
+        page_urls = [
+            listing_page_path(name, page).name for page in range(1, len(chunks) + 1)
+        ]
+        categories = sorted(
+            set(cat for post in listing_posts for cat in post["categories"])
+        )
+        for page, page_posts in enumerate(chunks, 1):
+            pages.append(
+                (
+                    page_urls[page - 1],
+                    {
+                        "title": title,
+                        "posts": page_posts,
+                        "page_type": page_type,
+                        "page": page,
+                        "page_urls": page_urls,
+                        "categories": categories,
+                        "section": section,
+                    },
+                )
+            )
+    return pages
+
+
+def generate_listing(title, posts, output_path, page_type="listing", **pagination):
+    """Generate a listing page (see write_listing for the pagination arguments)"""
+    with trace_span("generate_listing", page=Path(output_path).name):
+        with open(output_path, "w", encoding="utf-8") as f:
+            write_listing(f, title, posts, page_type, **pagination)
+
+
+def write_listing(
+    f,
+    title,
+    posts,
+    page_type="listing",
+    page=1,
+    page_urls=None,
+    categories=None,
+    section=None,
+):
+    """Write a listing page to the text stream f
+
+    For paginated listings `posts` holds only this page's posts, `page_urls`
+    the file names of every page and `categories` those of the whole listing.
+    `section` limits the category filter to one section's posts.
+    """
+    page_urls = page_urls or []
     header_html = ""
     if page_type == "home":
         header_html = """
@@ -452,15 +1473,15 @@ def generate_listing(title, posts, output_path, page_type="listing"):
         """
 
     filter_html = ""
-    if page_type != "home" and posts:
+    if categories is None:
         categories = sorted(set(cat for post in posts for cat in post["categories"]))
-        if categories:
-            options = ['<option value="">All Categories</option>']
-            for cat in categories:
-                options.append(
-                    f'<option value="{cat}">{cat.replace("-", " ").title()}</option>'
-                )
-            filter_html = f"""
+    if page_type != "home" and categories:
+        options = ['<option value="">All Categories</option>']
+        for cat in categories:
+            options.append(
+                f'<option value="{cat}">{cat.replace("-", " ").title()}</option>'
+            )
+        filter_html = f"""
             <div class="category-filter">
                 <label for="category-select">Filter by category:</label>
                 <select id="category-select">
@@ -469,22 +1490,62 @@ def generate_listing(title, posts, output_path, page_type="listing"):
             </div>
             """.strip()
 
-    posts_html = ""
-    for post in posts:
-        post_url = f"{post['section']}_{post['slug']}.html"
-        categories_html = "".join(
-            [f"<span>{cat}</span>" for cat in post["categories"][:3]]
+    # The client filter answers from the site-wide search index, so it
+    # only needs to know which section this listing shows
+    section_attr = f' data-section="{section}"' if section else ""
+    page_title = title if page == 1 else f"{title} (Page {page})"
+
+    head, middle, tail = compile_layout(page_type)
+
+    # Stream the page chunk by chunk so memory and copying stay linear in
+    # the number of posts
+    f.write(head)
+    f.write(f"{page_title} - Thomas W. Bush")
+    f.write(middle)
+    f.write(
+        f"""
+    {header_html}
+    <h1>{title}</h1>
+    {filter_html}
+    <div class="post-list"{section_attr}>
+        """
+    )
+    f.writelines(listing_item_html(post) for post in posts)
+    f.write(
+        """
+    </div>
+    """
+    )
+    f.write(pagination_html(page, page_urls))
+    f.write(tail)
+
+
+def post_cover_path(post):
+    """Site-relative path of a post's cover image, or "" if it has none"""
+    img_path = post["frontmatter"].get("image", "")
+    if img_path.startswith("images/"):
+        img_path = f"{post['section']}_{post['slug']}_images/{img_path[7:]}"
+    return img_path
+
+
+def listing_item_html(post):
+    """Render one post entry of a listing page"""
+    post_url = f"{post['section']}_{post['slug']}.html"
+    categories_html = "".join(
+        [f"<span>{cat}</span>" for cat in post["categories"][:3]]
+    )
+    desc_attr = post["description"].lower() if post["description"] else ""
+    cats_attr = " ".join(post["categories"])
+    cover_html = ""
+    img_path = post_cover_path(post)
+    if img_path:
+        cover_html = f'<div class="post-cover-small"><img src="{img_path}" alt="{post["title"]}" loading="lazy"></div>'
+        cover_html = add_image_dimensions(cover_html, post.get("image_sizes"))
+        cover_html = add_responsive_images(
+            cover_html, post.get("image_variants"), COVER_IMAGE_SIZES
         )
-        desc_attr = post["description"].lower() if post["description"] else ""
-        cats_attr = " ".join(post["categories"])
-        cover_html = ""
-        if "image" in post["frontmatter"]:
-            img_path = post["frontmatter"]["image"]
-            if img_path.startswith("images/"):
-                img_path = f"{post['section']}_{post['slug']}_images/{img_path[7:]}"
-            cover_html = f'<div class="post-cover-small"><img src="{img_path}" alt="{post["title"]}" loading="lazy"></div>'
-
-        posts_html += f"""
+
+    return f"""
         <div class="post-item" data-categories="{cats_attr}" data-title="{post["title"].lower()}" data-description="{desc_attr}">
             {cover_html}
             <h2 class="post-title"><a href="{post_url}">{post["title"]}</a></h2>
@@ -496,23 +1557,214 @@ def generate_listing(title, posts, output_path, page_type="listing"):
         </div>
         """
 
-    page_content = f"""
-    {header_html}
-    <h1>{title}</h1>
-    {filter_html}
-    <div class="post-list">
-        {posts_html}
-    </div>
+
+SEARCH_TOKEN_RE = re.compile(r"[^\W_]+")
+
+
+def search_terms(text):
+    """Split text into lowercase search terms, the same way search.js splits queries"""
+    return SEARCH_TOKEN_RE.findall(text.lower())
+
+
+def build_search_index(posts, ids, frequencies, gram_shards):
+    """Build the client search index for posts
+
+    Terms are sorted in JavaScript string order so search.js can find every
+    term with a given prefix by binary search; postings[i] lists the ids
+    (positions in "posts", see search_ids) of the posts containing terms[i].
+    "lengths" and "avgLength" are what search.js needs, with the term
+    shards' counts, to score posts by BM25.
     """
+    size = max(ids.values(), default=-1) + 1
+    entries = [None] * size
+    lengths = [0] * size
+    postings = {}
+    for post, tf in zip(posts, frequencies):
+        url = f"{post['section']}_{post['slug']}.html"
+        post_id = ids[url]
+        description = post["description"] or ""
+        entries[post_id] = {
+            "url": url,
+            "title": post["title"],
+            "date": str(post["date"]),
+            "section": post["section"],
+            "categories": post["categories"],
+            "description": description,
+            "image": post_cover_path(post),
+        }
+        lengths[post_id] = sum(tf.values())
+        text = " ".join([post["title"], description, " ".join(post["categories"])])
+        for term in set(search_terms(text)):
+            postings.setdefault(term, []).append(post_id)
+
+    terms = sorted(postings, key=lambda term: term.encode("utf-16-be"))
+    return {
+        "terms": terms,
+        "postings": [sorted(postings[term]) for term in terms],
+        "posts": entries,
+        "lengths": lengths,
+        "avgLength": round(sum(lengths) / len(posts), 3) if posts else 0,
+        "gramShards": gram_shards,
+    }
+
+
+# Full-text index: BM25 parameters (applied by search.js) and how much each
+# field counts towards a term's frequency in a post
+BM25_K1 = 1.2
+BM25_B = 0.75
+SEARCH_FIELD_WEIGHTS = {"title": 3, "description": 2, "categories": 2, "body": 1}
+
+# Trigram shards hold the trigrams of about this many terms each; there is
+# a power of two of them, so their number only moves when the vocabulary
+# doubles or halves
+SEARCH_TERMS_PER_GRAM_SHARD = 32
 
-    html = generate_html_layout(f"{title} - Thomas W. Bush", page_content, page_type)
 
-    with open(output_path, "w", encoding="utf-8") as f:
-        f.write(html)
+def post_term_frequencies(post):
+    """Field-weighted frequency of each search term in a post; the post's
+    length for BM25 is their sum"""
+    fields = {
+        "title": post["title"],
+        "description": post["description"] or "",
+        "categories": " ".join(post["categories"]),
+        "body": post_body(post),
+    }
+    tf = {}
+    for field, text in fields.items():
+        weight = SEARCH_FIELD_WEIGHTS[field]
+        for term in search_terms(text):
+            tf[term] = tf.get(term, 0) + weight
+    return tf
+
+
+def search_ids(posts, old_ids=None):
+    """Map each post's URL to its search id, its position in the index's
+    "posts"
+
+    Posts keep their id from old_ids, so an edit leaves the postings of
+    every other post as they were; new posts take the lowest free ids,
+    which deleted posts leave behind as holes.
+    """
+    urls = [f"{post['section']}_{post['slug']}.html" for post in posts]
+    live = set(urls)
+    ids = {url: post_id for url, post_id in (old_ids or {}).items() if url in live}
+    taken = set(ids.values())
+    next_id = 0
+    for url in urls:
+        if url not in ids:
+            while next_id in taken:
+                next_id += 1
+            ids[url] = next_id
+            next_id += 1
+    return ids
+
+
+def term_trigrams(term):
+    """Distinct trigrams of a term (the term itself if it is shorter)"""
+    if len(term) < 3:
+        return {term}
+    return {term[i : i + 3] for i in range(len(term) - 2)}
+
+
+def gram_shard_count(vocabulary_size):
+    """Number of trigram shards for a vocabulary of the given size"""
+    count = 1
+    while count * SEARCH_TERMS_PER_GRAM_SHARD < vocabulary_size:
+        count *= 2
+    return count
+
+
+def gram_shard(gram, count):
+    """Trigram shard of gram: the 32-bit FNV-1a hash of its code points,
+    computed the same way by search.js, modulo the shard count"""
+    h = 0x811C9DC5
+    for c in gram:
+        h = (h ^ ord(c)) * 0x01000193 & 0xFFFFFFFF
+    return h % count
+
+
+def shard_name(kind, key):
+    """File name of the index shard for key: "t" shards hold terms by their
+    first two characters, "g" shards trigrams by gram_shard number"""
+    safe = "".join(c if c.isascii() and c.isalnum() else f"_{ord(c):x}" for c in key)
+    return f"{kind}-{safe}.json"
+
+
+def build_fulltext_index(ids, frequencies, gram_shards, terms=None, grams=None):
+    """Build the sharded full-text index as {file name: shard}
+
+    ids lists each post's search id and frequencies its term frequencies.
+    Term shards map each term to [post id, frequency] pairs, which search.js
+    weighs by BM25; trigram shards map each trigram to the terms containing
+    it, which is how search.js finds the terms close to a misspelt query
+    word. With terms, only the term shards holding one of them are built,
+    and with grams only the trigram shards numbered in it.
+    """
+    wanted = None if terms is None else {term[:2] for term in terms}
+    postings = {}
+    if wanted is None or wanted:
+        for post_id, tf in zip(ids, frequencies):
+            for term, count in tf.items():
+                if wanted is None or term[:2] in wanted:
+                    postings.setdefault(term, []).append([post_id, count])
+
+    shards = {}
+    for term, entries in postings.items():
+        entries.sort()
+        shards.setdefault(shard_name("t", term[:2]), {})[term] = entries
+    if grams is None or grams:
+        vocabulary = set().union(*frequencies)
+        for term in vocabulary:
+            for gram in term_trigrams(term):
+                number = gram_shard(gram, gram_shards)
+                if grams is None or number in grams:
+                    shard = shards.setdefault(shard_name("g", str(number)), {})
+                    shard.setdefault(gram, []).append(term)
+        for name, shard in shards.items():
+            if name.startswith("g-"):
+                for gram_terms in shard.values():
+                    gram_terms.sort()
+    return shards
+
+
+def search_files(posts, ids=None, frequencies=None, terms=None, grams=None):
+    """Serialize the search index and full-text shards as {site path: JSON}
+
+    ids defaults to numbering posts in order and frequencies to reading
+    each post; terms and grams pick the shards to build as in
+    build_fulltext_index.
+    """
+    if ids is None:
+        ids = search_ids(posts)
+    if frequencies is None:
+        frequencies = [post_term_frequencies(post) for post in posts]
+    post_ids = [ids[f"{post['section']}_{post['slug']}.html"] for post in posts]
+    gram_shards = gram_shard_count(len(set().union(*frequencies)))
+    files = {
+        "search-index.json": json.dumps(
+            build_search_index(posts, ids, frequencies, gram_shards),
+            ensure_ascii=False,
+            separators=(",", ":"),
+        )
+    }
+    for name, shard in build_fulltext_index(
+        post_ids, frequencies, gram_shards, terms, grams
+    ).items():
+        files[f"search/{name}"] = json.dumps(
+            shard, ensure_ascii=False, separators=(",", ":"), sort_keys=True
+        )
+    return files
 
 
-def generate_about_page(base_dir, output_dir):
+def generate_about_page(base_dir, output_dir, image_sizes=None):
     """Generate about page"""
+    with trace_span("generate_about_page", page="about.html"):
+        with open(Path(output_dir) / "about.html", "w", encoding="utf-8") as f:
+            f.write(render_about_page(base_dir, image_sizes))
+
+
+def render_about_page(base_dir, image_sizes=None):
+    """Render the about page from about.qmd (or a placeholder without it)"""
     about_path = Path(base_dir) / "about.qmd"
     if not about_path.exists():
         page_content = """
@@ -524,16 +1776,14 @@ def generate_about_page(base_dir, output_dir):
             <p>Welcome to my blog.</p>
         </article>
         """
-        html = generate_html_layout("About - Thomas W. Bush", page_content, "page")
-        with open(Path(output_dir) / "about.html", "w", encoding="utf-8") as f:
-            f.write(html)
-        return
+        page_content = add_image_dimensions(page_content, image_sizes)
+        return generate_html_layout("About - Thomas W. Bush", page_content, "page")
 
     with open(about_path, "r", encoding="utf-8") as f:
         content = f.read()
 
     frontmatter, body = parse_frontmatter(content)
-    html_content = md_to_html(body)
+    html_content = md_to_html(body, name=str(about_path))
 
     social_links_html = ""
     links = []
@@ -575,77 +1825,775 @@ def generate_about_page(base_dir, output_dir):
         {social_links_html}
     </article>
     """
+    page_content = add_image_dimensions(page_content, image_sizes)
 
-    html = generate_html_layout("About - Thomas W. Bush", page_content, "page")
+    return generate_html_layout("About - Thomas W. Bush", page_content, "page")
 
-    with open(Path(output_dir) / "about.html", "w", encoding="utf-8") as f:
-        f.write(html)
 
+RESPONSIVE_IMAGE_TYPES = (".png", ".jpg", ".jpeg")
+IMAGE_SIZE_TYPES = (".png", ".jpg", ".jpeg", ".gif", ".webp")
 
-def build_site(base_dir, output_dir):
-    """Build the entire site"""
-    base = Path(base_dir)
+
+def generate_image_variants(
+    assets, digests, output_dir, cache_dir, is_stale, jobs=1
+):
+    """Make the responsive variants of post images with optimize_images
+
+    Returns {image src: [{"width", "format", "src"}]} for every post image,
+    making only the variants is_stale reports as out of date: from the
+    image cache when it has them, otherwise encoded on jobs processes
+    within optimize_images' memory budget. An image any of whose variants
+    fails to encode gets none.
+    """
     output = Path(output_dir)
+    formats = optimize_images.variant_formats()
+    image_variants = {}
+    if not formats:
+        return image_variants
+
+    misses = []
+    for src, dst in assets:
+        if (
+            not dst.parent.name.endswith("_images")
+            or dst.suffix.lower() not in RESPONSIVE_IMAGE_TYPES
+        ):
+            continue
+        rel = dst.relative_to(output).as_posix()
+        try:
+            widths = optimize_images.variant_widths(src)
+        except OSError as e:
+            print(f"  Skipping responsive variants of {src.name}: {e}")
+            continue
+        memory = optimize_images.estimate_memory(src)
+        variants = []
+        for width in widths:
+            for fmt in formats:
+                path = dst.with_name(f"{dst.stem}-{width}.{fmt}")
+                digest = hash_content(
+                    digests[dst], str(width), fmt, str(optimize_images.CACHE_VERSION)
+                )
+                if is_stale(path, digest):
+                    cached_path = optimize_images.variant_cache_path(
+                        digests[dst], width, fmt, cache_dir
+                    )
+                    if cached_path.exists():
+                        optimize_images.install_image(cached_path, path)
+                    else:
+                        misses.append((src, width, fmt, cached_path, memory, path, rel))
+                variants.append(
+                    {
+                        "width": width,
+                        "format": fmt,
+                        "src": path.relative_to(output).as_posix(),
+                    }
+                )
+        image_variants[rel] = variants
+
+    if misses:
+        Path(cache_dir).mkdir(exist_ok=True)
+        with trace_span("optimize_images", variants=len(misses)):
+            for task, encoded in optimize_images.run_with_memory_budget(
+                misses,
+                jobs,
+                optimize_images.MEMORY_BUDGET_MB << 20,
+                optimize_images.encode_variant,
+            ):
+                src, _, _, cached_path, _, path, rel = task
+                if encoded:
+                    optimize_images.install_image(cached_path, path)
+                elif image_variants.pop(rel, None) is not None:
+                    print(f"  Skipping responsive variants of {src.name}")
+    return image_variants
+
+
+def hash_content(*parts):
+    """Return a stable hex digest for a sequence of strings or bytes"""
+    h = hashlib.sha256()
+    for part in parts:
+        if isinstance(part, str):
+            part = part.encode("utf-8")
+        h.update(part)
+        h.update(b"\0")
+    return h.hexdigest()
+
+
+def hash_file(path):
+    """Return the hex digest of a file's contents"""
+    h = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(1 << 20), b""):
+            h.update(chunk)
+    return h.hexdigest()
+
+
+def listing_digest(code_digest, posts):
+    """Digest of everything a listing page renders from its posts"""
+    entries = [
+        [
+            p["section"],
+            p["slug"],
+            p["title"],
+            p["date"],
+            p["categories"],
+            p["description"],
+            p["frontmatter"].get("image", ""),
+            p.get("image_variants", {}).get(post_cover_path(p)),
+            p.get("image_sizes", {}).get(post_cover_path(p)),
+        ]
+        for p in posts
+    ]
+    return hash_content(code_digest, json.dumps(entries, default=str))
 
-    if output.exists():
-        shutil.rmtree(output)
-    output.mkdir()
 
-    copy_assets(base_dir, output_dir)
+def load_manifest(manifest_path):
+    """Load the manifest of a previous build
 
-    posts = get_all_posts(base_dir)
+    "output" is the resolved directory that build wrote, "outputs" maps
+    each of its files to the digest of its inputs, "sources"
+    maps asset sources to their [size, mtime_ns, digest] and "dimensions"
+    maps published images to their [size, mtime_ns, width, height];
+    "search" holds each post's
+    search id and term frequencies (see build_site).
+    """
+    empty = {
+        "output": None,
+        "outputs": {},
+        "sources": {},
+        "dimensions": {},
+        "search": {},
+    }
+    try:
+        with open(manifest_path, "r", encoding="utf-8") as f:
+            manifest = json.load(f)
+    except (OSError, ValueError):
+        return empty
+    if manifest.get("version") != MANIFEST_VERSION:
+        return empty
+    return {key: manifest.get(key, default) for key, default in empty.items()}
+
+
+def save_manifest(manifest_path, output_dir, outputs, sources, dimensions, search):
+    """Write the output, source-digest, image-size and search manifest for
+    the next build"""
+    # json.dumps, unlike json.dump, encodes in one pass of the C encoder
+    text = json.dumps(
+        {
+            "version": MANIFEST_VERSION,
+            "output": str(Path(output_dir).resolve()),
+            "outputs": outputs,
+            "sources": sources,
+            "dimensions": dimensions,
+            "search": search,
+        },
+        separators=(",", ":"),
+        sort_keys=True,
+    )
+    with open(manifest_path, "w", encoding="utf-8") as f:
+        f.write(text)
+
+
+def cached_file_digest(path, old_sources, new_sources, key):
+    """Digest of a file, reusing the previous build's digest while its size
+    and mtime are unchanged"""
+    stat = os.stat(path)
+    cached = old_sources.get(key)
+    if cached and cached[:2] == [stat.st_size, stat.st_mtime_ns]:
+        digest = cached[2]
+    else:
+        digest = hash_file(path)
+    new_sources[key] = [stat.st_size, stat.st_mtime_ns, digest]
+    return digest
+
+
+# Minification: raw-text elements and MathJax spans are copied verbatim, and
+# whitespace next to block-level tags is dropped since it never renders
+HTML_TOKEN_RE = re.compile(
+    r"<(pre|script|style|textarea)\b[^>]*>.*?</\1\s*>"
+    r"|<code\b[^>]*>.*?</code\s*>"
+    r"|<!--.*?-->"
+    r"|<(/?[A-Za-z!][\w:-]*)[^>]*>"
+    r"|\$\$.*?\$\$|\\\[.*?\\\]|\\\(.*?\\\)|\$[^$<>]*\$",
+    re.S | re.I,
+)
+WHITESPACE_RE = re.compile(r"\s+")
+BLOCK_TAGS = {
+    "!doctype", "html", "head", "body", "title", "meta", "link", "script",
+    "style", "pre", "nav", "main", "article", "aside", "section", "header",
+    "footer", "div", "p", "ul", "ol", "li", "h1", "h2", "h3", "h4", "h5",
+    "h6", "table", "thead", "tbody", "tr", "td", "th", "blockquote", "hr",
+    "br", "select", "option", "picture", "source",
+}
+CSS_TOKEN_RE = re.compile(r"/\*.*?\*/|\"(?:\\.|[^\"\\])*\"|'(?:\\.|[^'\\])*'", re.S)
+CSS_PUNCTUATION_RE = re.compile(r"\s*([{};,>])\s*")
+
+
+def minify_html(html):
+    """Collapse insignificant whitespace in an HTML page
+
+    <pre>, <code>, <script>, <style> and <textarea> contents, tags
+    themselves and MathJax spans ($..$, $$..$$, \\(..\\), \\[..\\]) are
+    kept byte for byte.
+    """
+    out = []
+    pos = 0
+    after_block = True
+    for match in HTML_TOKEN_RE.finditer(html):
+        text = WHITESPACE_RE.sub(" ", html[pos : match.start()])
+        name = (match.group(1) or match.group(2) or "").lstrip("/").lower()
+        block = name in BLOCK_TAGS
+        if after_block:
+            text = text.lstrip()
+        if block:
+            text = text.rstrip()
+        out.append(text)
+        out.append(match.group(0))
+        after_block = block
+        pos = match.end()
+    tail = WHITESPACE_RE.sub(" ", html[pos:])
+    out.append(tail.strip() if after_block else tail.rstrip())
+    return "".join(out) + "\n"
+
+
+def minify_css(css):
+    """Drop comments and whitespace around CSS punctuation (strings kept)"""
+    out = []
+    pos = 0
+    for match in CSS_TOKEN_RE.finditer(css + "/**/"):
+        chunk = WHITESPACE_RE.sub(" ", css[pos : match.start()])
+        out.append(CSS_PUNCTUATION_RE.sub(r"\1", chunk))
+        if not match.group(0).startswith("/*"):
+            out.append(match.group(0))
+        pos = match.end()
+    return "".join(out).replace(";}", "}").strip() + "\n"
+
+
+def minify_js(js):
+    """Drop indentation, blank lines and whole-line // comments
+
+    Line breaks are kept so automatic semicolon insertion is unaffected.
+    """
+    lines = (line.strip() for line in js.splitlines())
+    return "\n".join(line for line in lines if line and not line.startswith("//")) + "\n"
 
-    research_posts = [p for p in posts if p["section"] == "research"]
-    books_posts = [p for p in posts if p["section"] == "books"]
 
-    for post in posts:
-        generate_post_page(post, output_dir)
+MINIFIERS = {".html": minify_html, ".css": minify_css, ".js": minify_js}
 
-    generate_listing("Recent Posts", posts, output / "index.html", "home")
-    generate_listing("Research", research_posts, output / "research.html", "listing")
-    generate_listing("Books", books_posts, output / "books.html", "listing")
 
-    generate_about_page(base_dir, output_dir)
+def minify_outputs(output_dir, rels):
+    """Minify the given HTML, CSS and JS outputs in place
 
-    search_js = """// Simple client-side search
+    Files are replaced by rename, so a hardlinked asset's source is never
+    modified. Returns {file type: bytes saved}.
+    """
+    output = Path(output_dir)
+    saved = {}
+    for rel in rels:
+        suffix = Path(rel).suffix
+        if suffix not in MINIFIERS:
+            continue
+        path = output / rel
+        with open(path, "r", encoding="utf-8") as f:
+            text = f.read()
+        minified = MINIFIERS[suffix](text)
+        tmp_path = path.with_name(f".tmp-{path.name}")
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            f.write(minified)
+        os.replace(tmp_path, path)
+        saved[suffix[1:]] = saved.get(suffix[1:], 0) + len(text.encode()) - len(
+            minified.encode()
+        )
+    return saved
+
+
+COMPRESSIBLE_TYPES = (".html", ".css", ".js", ".json", ".svg", ".xml", ".txt")
+
+
+def compress_file(path, encoding):
+    """Write the .gz or .br sibling of path at maximum compression"""
+    data = Path(path).read_bytes()
+    if encoding == "br":
+        packed = brotli.compress(data, quality=11)
+    else:
+        # mtime=0 keeps the output reproducible
+        packed = gzip.compress(data, compresslevel=9, mtime=0)
+    with open(f"{path}.{encoding}", "wb") as f:
+        f.write(packed)
+
+
+def compress_outputs(output_dir, outputs, is_stale, jobs=None):
+    """Precompress every compressible output whose siblings are out of date
+
+    A sibling's digest is its output's digest, so it is only rewritten
+    when the output itself was. Files are compressed on jobs threads, by
+    default one per CPU. Returns the number of files written.
+    """
+    output = Path(output_dir)
+    encodings = ["gz", "br"] if brotli is not None else ["gz"]
+    tasks = []
+    for rel, digest in list(outputs.items()):
+        if Path(rel).suffix not in COMPRESSIBLE_TYPES:
+            continue
+        for encoding in encodings:
+            if is_stale(output / f"{rel}.{encoding}", hash_content(digest, encoding)):
+                tasks.append((output / rel, encoding))
+
+    # zlib and brotli release the GIL while compressing, so unlike rendering
+    # this scales on threads whatever --jobs is
+    with ThreadPoolExecutor(max_workers=jobs or os.cpu_count() or 1) as pool:
+        for _ in pool.map(lambda task: compress_file(*task), tasks):
+            pass
+    return len(tasks)
+
+
+def remove_stale_outputs(output_dir, old_outputs, new_outputs):
+    """Delete outputs from a previous build that no longer have a source"""
+    output = Path(output_dir)
+    removed = 0
+    for rel in old_outputs.keys() - new_outputs.keys():
+        path = output / rel
+        if path.is_file():
+            path.unlink()
+            removed += 1
+            parent = path.parent
+            if parent != output and not any(parent.iterdir()):
+                parent.rmdir()
+    return removed
+
+
+# Chrome trace events of the spans recorded while a build is traced
+# (--trace); None when tracing is off
+trace_events = None
+
+
+def trace_event(name, start_ns, end_ns, **args):
+    """Chrome trace "complete" event for a span of this thread"""
+    return {
+        "name": name,
+        "ph": "X",
+        "ts": start_ns / 1000,
+        "dur": (end_ns - start_ns) / 1000,
+        "pid": os.getpid(),
+        "tid": threading.get_ident(),
+        "args": args,
+    }
+
+
+def trace_span(name, **args):
+    """Record the block as a span named name while tracing is on
+
+    Off, it is a shared no-op context, cheap enough for per-header calls.
+    """
+    if trace_events is None:
+        return NO_SPAN
+    return recorded_span(name, args)
+
+
+NO_SPAN = nullcontext()
+
+
+@contextmanager
+def recorded_span(name, args):
+    """Append the block's span to trace_events"""
+    start = time.perf_counter_ns()
+    try:
+        yield
+    finally:
+        trace_events.append(trace_event(name, start, time.perf_counter_ns(), **args))
+
+
+def start_trace():
+    """Start recording trace events"""
+    global trace_events
+    trace_events = []
+
+
+def stop_trace():
+    """Stop recording and return the trace events"""
+    global trace_events
+    events, trace_events = trace_events, None
+    return events
+
+
+def write_trace(path, events):
+    """Write events as a Chrome trace file (chrome://tracing, Perfetto)"""
+    origin = min((event["ts"] for event in events), default=0)
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(
+            {
+                "traceEvents": [{**event, "ts": event["ts"] - origin} for event in events],
+                "displayTimeUnit": "ms",
+            },
+            f,
+        )
+
+
+def page_times(events):
+    """[(page, total ms, md_to_html ms)] for every page span in events,
+    slowest first"""
+    threads = {}
+    for event in events:
+        if "page" in event["args"] or event["name"] == "md_to_html":
+            threads.setdefault((event["pid"], event["tid"]), []).append(event)
+
+    rows = []
+    for thread_events in threads.values():
+        # Pages of one thread never overlap, so an md_to_html span belongs
+        # to the page that started last before it, if it ends after it
+        thread_events.sort(key=lambda event: event["ts"])
+        page = None
+        for event in thread_events:
+            if "page" in event["args"]:
+                page = [event["args"]["page"], event["dur"] / 1000, 0.0]
+                page_end = event["ts"] + event["dur"]
+                rows.append(page)
+            elif page and event["ts"] < page_end:
+                page[2] += event["dur"] / 1000
+    rows.sort(key=lambda row: row[1], reverse=True)
+    return [tuple(row) for row in rows]
+
+
+def stage_timer(timings, memory=None):
+    """Return lap(stage), which adds the time since the previous lap to
+    timings[stage] and records the stage as a trace span while tracing
+
+    While tracemalloc is tracing, memory[stage] also gets the stage's
+    "peak" traced bytes and the bytes it "retained" (still allocated when
+    it ended). A lap with none of these to record is not measured.
+    """
+    last = time.perf_counter_ns()
+    if memory is not None and not tracemalloc.is_tracing():
+        memory = None
+    if memory is not None:
+        tracemalloc.reset_peak()
+        last_memory = tracemalloc.get_traced_memory()[0]
+
+    def lap(stage):
+        nonlocal last, last_memory
+        if timings is None and trace_events is None and memory is None:
+            return
+        now = time.perf_counter_ns()
+        if timings is not None:
+            timings[stage] = timings.get(stage, 0.0) + (now - last) / 1e9
+        if trace_events is not None:
+            trace_events.append(trace_event(stage, last, now, stage=True))
+        if memory is not None:
+            current, peak = tracemalloc.get_traced_memory()
+            memory[stage] = {"peak": peak, "retained": current - last_memory}
+            tracemalloc.reset_peak()
+            last_memory = current
+        last = now
+
+    return lap
+
+
+def largest_posts_memory(posts, limit=10):
+    """[(page, source bytes, peak bytes)] of rendering the limit largest
+    posts, measured with tracemalloc (which must be tracing)"""
+    rows = []
+    largest = sorted(posts, key=lambda post: os.path.getsize(post["path"]), reverse=True)
+    for post in largest[:limit]:
+        start = tracemalloc.get_traced_memory()[0]
+        tracemalloc.reset_peak()
+        render_post_page(post)
+        peak = tracemalloc.get_traced_memory()[1] - start
+        page = f"{post['section']}_{post['slug']}.html"
+        rows.append((page, os.path.getsize(post["path"]), peak))
+    return rows
+
+
+SEARCH_JS = """// Client-side search answered from the prebuilt search-index.json and the
+// full-text index shards in search/
 document.addEventListener('DOMContentLoaded', function() {
     const searchInput = document.getElementById('search-input');
     const categorySelect = document.getElementById('category-select');
-    const posts = document.querySelectorAll('.post-item');
+    const postList = document.querySelector('.post-list');
+    const pagination = document.querySelector('.pagination');
+    const pagePosts = document.querySelectorAll('.post-item');
+    const section = postList ? postList.getAttribute('data-section') : null;
+    let index = null;
+    let loading = null;
+    let results = null;
+    let searchId = 0;
+    const shards = {};
+    // Must match BM25_K1 and BM25_B in build_simple.py
+    const BM25_K1 = 1.2;
+    const BM25_B = 0.75;
     
-    function filterPosts() {
-        const query = searchInput ? searchInput.value.toLowerCase().trim() : '';
-        const selectedCategory = categorySelect ? categorySelect.value.toLowerCase() : '';
-        
-        posts.forEach(post => {
-            let show = true;
-            
-            if (query) {
-                const title = post.getAttribute('data-title') || '';
-                const description = post.getAttribute('data-description') || '';
-                const categories = post.getAttribute('data-categories') || '';
-                const match = title.includes(query) || 
-                             description.includes(query) || 
-                             categories.includes(query);
-                if (!match) show = false;
+    // The index is only fetched once the reader starts searching
+    function loadIndex() {
+        if (!loading) {
+            loading = fetch('search-index.json')
+                .then(response => response.json())
+                .then(data => {
+                    index = data;
+                    // Deleted posts leave null holes in posts
+                    index.postCount = index.posts.filter(Boolean).length;
+                })
+                .catch(() => { index = false; });
+        }
+        return loading;
+    }
+    
+    function lowerBound(terms, key) {
+        let lo = 0;
+        let hi = terms.length;
+        while (lo < hi) {
+            const mid = (lo + hi) >> 1;
+            if (terms[mid] < key) {
+                lo = mid + 1;
+            } else {
+                hi = mid;
             }
-            
-            if (selectedCategory && show) {
-                const categories = post.getAttribute('data-categories') || '';
-                if (!categories.includes(selectedCategory)) {
-                    show = false;
+        }
+        return lo;
+    }
+    
+    // Ids of the posts containing a term that starts with token
+    function lookup(token) {
+        const ids = new Set();
+        for (let i = lowerBound(index.terms, token);
+             i < index.terms.length && index.terms[i].startsWith(token); i++) {
+            index.postings[i].forEach(id => ids.add(id));
+        }
+        return ids;
+    }
+    
+    // Ids of the posts whose title, description or categories hold a
+    // term starting with every token
+    function prefixSearch(tokens) {
+        let ids = null;
+        tokens.forEach(token => {
+            const matches = lookup(token);
+            ids = ids ? new Set([...ids].filter(id => matches.has(id))) : matches;
+        });
+        return Array.from(ids).sort((a, b) => a - b);
+    }
+    
+    // Must match shard_name() in build_simple.py
+    function loadShard(kind, key) {
+        const name = Array.from(key).map(c =>
+            /^[a-zA-Z0-9]$/.test(c) ? c : '_' + c.codePointAt(0).toString(16)
+        ).join('');
+        const url = 'search/' + kind + '-' + name + '.json';
+        if (!shards[url]) {
+            shards[url] = fetch(url)
+                .then(response => response.ok ? response.json() : {})
+                .catch(() => ({}));
+        }
+        return shards[url];
+    }
+    
+    // Must match gram_shard() in build_simple.py
+    function gramShard(gram) {
+        let hash = 0x811c9dc5;
+        for (const c of gram) {
+            hash = Math.imul(hash ^ c.codePointAt(0), 0x01000193) >>> 0;
+        }
+        return hash % index.gramShards;
+    }
+    
+    function trigrams(term) {
+        const chars = Array.from(term);
+        if (chars.length < 3) return [term];
+        const grams = new Set();
+        for (let i = 0; i + 3 <= chars.length; i++) {
+            grams.add(chars.slice(i, i + 3).join(''));
+        }
+        return Array.from(grams);
+    }
+    
+    // Whether a and b only differ by two neighbouring characters swapped
+    function transposed(a, b) {
+        const x = Array.from(a);
+        const y = Array.from(b);
+        if (x.length !== y.length) return false;
+        let i = 0;
+        while (i < x.length && x[i] === y[i]) i++;
+        return i + 1 < x.length && x[i] === y[i + 1] && x[i + 1] === y[i] &&
+            x.slice(i + 2).join('') === y.slice(i + 2).join('');
+    }
+    
+    // Terms of the corpus sharing enough trigrams with token to count as
+    // the same word, mapped to their (Dice) similarity. A swap of two
+    // neighbouring letters breaks up to three trigrams, so transposed
+    // terms count as similar whatever their score; but only terms sharing
+    // a trigram with token are candidates at all, which rules out swaps in
+    // words of five letters or less ("form" for "from") and other typos
+    // touching every trigram
+    function similarTerms(token) {
+        const grams = trigrams(token);
+        return Promise.all(grams.map(gram =>
+            loadShard('g', String(gramShard(gram))).then(shard => shard[gram] || [])
+        )).then(lists => {
+            const shared = new Map();
+            lists.forEach(terms => terms.forEach(term => shared.set(term, (shared.get(term) || 0) + 1)));
+            const similar = new Map();
+            shared.forEach((count, term) => {
+                const score = 2 * count / (grams.length + trigrams(term).length);
+                if (score >= 0.5) {
+                    similar.set(term, score);
+                } else if (transposed(token, term)) {
+                    similar.set(term, 0.5);
                 }
+            });
+            return similar;
+        });
+    }
+    
+    // BM25 score of every post matching token, a typo costing its similarity
+    function tokenScores(token) {
+        return similarTerms(token).then(similar => Promise.all(
+            Array.from(similar.keys()).map(term =>
+                loadShard('t', Array.from(term).slice(0, 2).join('')).then(shard => [term, shard[term] || []])
+            )
+        ).then(entries => {
+            const scores = new Map();
+            entries.forEach(([term, postings]) => {
+                const df = postings.length;
+                const idf = Math.log(1 + (index.postCount - df + 0.5) / (df + 0.5));
+                postings.forEach(([id, count]) => {
+                    const norm = BM25_K1 * (1 - BM25_B + BM25_B * index.lengths[id] / index.avgLength);
+                    const score = idf * count * (BM25_K1 + 1) / (count + norm) * similar.get(term);
+                    if (score > (scores.get(id) || 0)) scores.set(id, score);
+                });
+            });
+            return scores;
+        }));
+    }
+    
+    // Ids of the posts matching every token anywhere in their text, best first
+    function fullTextSearch(tokens) {
+        return Promise.all(tokens.map(tokenScores)).then(perToken => {
+            const totals = new Map(perToken[0]);
+            perToken.slice(1).forEach(scores => totals.forEach((total, id) => {
+                if (scores.has(id)) {
+                    totals.set(id, total + scores.get(id));
+                } else {
+                    totals.delete(id);
+                }
+            }));
+            return Array.from(totals).sort((a, b) => b[1] - a[1]).map(([id]) => id);
+        });
+    }
+    
+    // Queries search the whole site; the category filter alone stays
+    // within the section this listing shows
+    function search(query, category) {
+        const tokens = query.toLowerCase().match(/[\\p{L}\\p{N}]+/gu) || [];
+        const ranked = tokens.length ? fullTextSearch(tokens) : Promise.resolve([]);
+        return ranked.then(ids => {
+            let found = index.posts.filter(Boolean).sort((a, b) => b.date.localeCompare(a.date));
+            if (tokens.length) {
+                // Title prefixes catch words still being typed
+                const seen = new Set(ids);
+                found = ids.concat(prefixSearch(tokens).filter(id => !seen.has(id)))
+                    .map(id => index.posts[id]);
             }
-            
-            if (show) {
-                post.classList.remove('hidden');
-            } else {
-                post.classList.add('hidden');
-            }
+            return found.filter(post =>
+                (query || !section || post.section === section) &&
+                (!category || post.categories.some(cat => cat.toLowerCase() === category))
+            );
+        });
+    }
+    
+    function element(tag, className, text) {
+        const node = document.createElement(tag);
+        if (className) node.className = className;
+        if (text) node.textContent = text;
+        return node;
+    }
+    
+    // Same markup as the post items of the generated listing pages
+    function renderPost(post) {
+        const item = element('div', 'post-item');
+        if (post.image) {
+            const cover = element('div', 'post-cover-small');
+            const img = element('img');
+            img.src = post.image;
+            img.alt = post.title;
+            img.loading = 'lazy';
+            cover.appendChild(img);
+            item.appendChild(cover);
+        }
+        const title = element('h2', 'post-title');
+        const link = element('a', '', post.title);
+        link.href = post.url;
+        title.appendChild(link);
+        item.appendChild(title);
+        const meta = element('div', 'post-meta');
+        meta.appendChild(element('time', '', post.date));
+        item.appendChild(meta);
+        if (post.categories.length) {
+            const categories = element('div', 'post-categories');
+            post.categories.slice(0, 3).forEach(cat => categories.appendChild(element('span', '', cat)));
+            item.appendChild(categories);
+        }
+        if (post.description) {
+            item.appendChild(element('div', 'post-description', post.description));
+        }
+        return item;
+    }
+    
+    // Fallback when the index cannot be fetched: filter this page's posts
+    function filterPage(query, category) {
+        pagePosts.forEach(post => {
+            const title = post.getAttribute('data-title') || '';
+            const description = post.getAttribute('data-description') || '';
+            const categories = post.getAttribute('data-categories') || '';
+            const show = (!query || title.includes(query) || description.includes(query) || categories.includes(query)) &&
+                         (!category || categories.toLowerCase().includes(category));
+            post.classList.toggle('hidden', !show);
+        });
+    }
+    
+    function filterPosts() {
+        const query = searchInput ? searchInput.value.trim() : '';
+        const category = categorySelect ? categorySelect.value.toLowerCase() : '';
+        const filtering = Boolean(query || category);
+        
+        if (filtering && index === null) {
+            loadIndex().then(filterPosts);
+            return;
+        }
+        if (index === false) {
+            filterPage(query.toLowerCase(), category);
+            return;
+        }
+        
+        const current = ++searchId;
+        if (!filtering) {
+            showResults(null);
+            return;
+        }
+        search(query, category).then(found => {
+            // Drop answers to queries that have since been retyped
+            if (current === searchId) showResults(found);
         });
     }
     
+    // Replace this page's posts with found, or restore them for null
+    function showResults(found) {
+        const filtering = found !== null;
+        if (pagination) {
+            pagination.classList.toggle('hidden', filtering);
+        }
+        pagePosts.forEach(post => post.classList.toggle('hidden', filtering));
+        if (results) {
+            results.remove();
+            results = null;
+        }
+        if (filtering && postList) {
+            results = element('div', 'post-list search-results');
+            found.forEach(post => results.appendChild(renderPost(post)));
+            if (!found.length) {
+                results.appendChild(element('p', 'search-empty', 'No matching posts.'));
+            }
+            postList.after(results);
+        }
+    }
+    
     if (searchInput) {
+        searchInput.addEventListener('focus', loadIndex, { once: true });
         searchInput.addEventListener('input', filterPosts);
     }
     
@@ -654,15 +2602,393 @@ document.addEventListener('DOMContentLoaded', function() {
     }
 });"""
 
-    with open(output / "search.js", "w", encoding="utf-8") as f:
-        f.write(search_js)
 
+def build_site(
+    base_dir,
+    output_dir,
+    incremental=False,
+    jobs=1,
+    page_size=LISTING_PAGE_SIZE,
+    asset_mode="reflink",
+    compress=True,
+    minify=False,
+    timings=None,
+    memory=None,
+):
+    """Build the entire site, or only the outputs whose inputs changed
+
+    If timings is a dict, the seconds spent in each stage of the build are
+    added to it by stage name; if memory is a dict and tracemalloc is
+    tracing, each stage's peak and retained bytes are (see stage_timer).
+    Returns the posts, with the image variants and sizes their pages were
+    rendered with.
+    """
+    lap = stage_timer(timings, memory)
+    base = Path(base_dir)
+    output = Path(output_dir)
+    manifest_path = output.parent / MANIFEST_NAME
+
+    manifest = load_manifest(manifest_path)
+    old_sources = manifest["sources"]
+    new_sources = {}
+    old_outputs = {}
+    # Outputs sharing a parent directory share its manifest, whose outputs
+    # only describe the directory the last build wrote
+    same_output = manifest["output"] == str(output.resolve())
+    if incremental and output.exists() and same_output:
+        old_outputs = manifest["outputs"]
+    else:
+        if output.exists():
+            shutil.rmtree(output)
+        output.mkdir()
+
+    new_outputs = {}
+    rebuilt = []
+
+    def is_stale(path, digest):
+        rel = Path(path).relative_to(output).as_posix()
+        new_outputs[rel] = digest
+        if old_outputs.get(rel) == digest and Path(path).exists():
+            return False
+        rebuilt.append(rel)
+        return True
+
+    # Any change to the layout/rendering code invalidates every page
+    code_digest = hash_content(hash_file(__file__), "minify" if minify else "")
+    lap("setup")
+
+    # Unchanged assets cost a stat: their digest is only recomputed when
+    # the source's size or mtime moved
+    all_assets = collect_assets(base_dir, output_dir)
+    digests = {
+        dst: cached_file_digest(
+            src, old_sources, new_sources, Path(src).relative_to(base).as_posix()
+        )
+        for src, dst in all_assets
+    }
+    lap("discovery")
+    assets = [
+        (src, dst)
+        for src, dst in all_assets
+        if is_stale(
+            dst,
+            hash_content(digests[dst], "minify")
+            if minify and dst.suffix in MINIFIERS
+            else digests[dst],
+        )
+    ]
+    with trace_span("copy_assets", files=len(assets)):
+        copy_assets(base_dir, output_dir, assets, asset_mode)
+    lap("assets")
+
+    # Image sizes come from the headers of the published files, which
+    # optimize_images.py may have resized in place since they were copied,
+    # cached while a file's size and mtime are unchanged
+    old_dimensions = manifest["dimensions"]
+    new_dimensions = {}
+    image_sizes = {}
+    for src, dst in all_assets:
+        if dst.suffix.lower() not in IMAGE_SIZE_TYPES:
+            continue
+        rel = dst.relative_to(output).as_posix()
+        stat = os.stat(dst)
+        cached = old_dimensions.get(rel)
+        if cached and cached[:2] == [stat.st_size, stat.st_mtime_ns]:
+            size = cached[2:]
+        else:
+            size = read_image_size(dst)
+        if size:
+            new_dimensions[rel] = [stat.st_size, stat.st_mtime_ns, *size]
+            image_sizes[rel] = list(size)
+
+    image_variants = {}
+    if optimize_images is not None:
+        image_variants = generate_image_variants(
+            all_assets,
+            digests,
+            output_dir,
+            base / optimize_images.CACHE_DIR,
+            is_stale,
+            jobs,
+        )
+    lap("images")
+
+    with trace_span("get_all_posts"):
+        posts = get_all_posts(base_dir, digests=True)
+    lap("parsing")
+
+    variants_by_dir = {}
+    for src, variants in image_variants.items():
+        variants_by_dir.setdefault(src.split("/")[0], {})[src] = variants
+    sizes_by_dir = {}
+    for src, size in image_sizes.items():
+        sizes_by_dir.setdefault(src.split("/")[0], {})[src] = size
+    for post in posts:
+        image_dir = f"{post['section']}_{post['slug']}_images"
+        post["image_variants"] = variants_by_dir.get(image_dir, {})
+        post["image_sizes"] = sizes_by_dir.get(image_dir, {})
+
+    stale_posts = [
+        post
+        for post in posts
+        if is_stale(
+            output / f"{post['section']}_{post['slug']}.html",
+            hash_content(
+                code_digest,
+                post["digest"],
+                json.dumps(
+                    [post["image_variants"], post["image_sizes"]], sort_keys=True
+                ),
+            ),
+        )
+    ]
+    render_posts(stale_posts, output_dir, jobs)
+    lap("rendering")
+
+    for name, listing in listing_pages(posts, page_size):
+        digest = hash_content(
+            listing_digest(code_digest, listing["posts"]),
+            json.dumps(
+                [
+                    listing["page"],
+                    listing["page_urls"],
+                    listing["categories"],
+                    listing["section"],
+                ]
+            ),
+        )
+        if is_stale(output / name, digest):
+            generate_listing(output_path=output / name, **listing)
+    lap("listings")
+
+    # Each post's term frequencies are kept in the manifest by its digest,
+    # so only edited posts are read again, and only the shards holding a
+    # term whose postings changed, or a trigram of a term that entered or
+    # left the vocabulary, are rebuilt
+    old_search = manifest["search"]
+    old_frequencies = old_search.get("terms", {})
+    old_keys = old_search.get("posts", {}) if old_outputs else {}
+    ids = search_ids(posts, old_search.get("ids") if old_outputs else None)
+    keys = {}
+    new_frequencies = {}
+    frequencies = []
+    for post in posts:
+        key = hash_content(code_digest, post["digest"])
+        tf = new_frequencies.get(key) or old_frequencies.get(key)
+        if tf is None:
+            tf = post_term_frequencies(post)
+        new_frequencies[key] = tf
+        keys[f"{post['section']}_{post['slug']}.html"] = key
+        frequencies.append(tf)
+    vocabulary = set().union(*frequencies)
+    gram_shards = gram_shard_count(len(vocabulary))
+
+    # A shard missing from the output has every shard rebuilt
+    old_shards = [
+        rel for rel in old_outputs if rel.startswith("search/") and rel.endswith(".json")
+    ]
+    terms = grams = None
+    if (
+        old_outputs
+        and old_search.get("code") == code_digest
+        and all(key in old_frequencies for key in old_keys.values())
+        and all((output / rel).exists() for rel in old_shards)
+    ):
+        terms = set()
+        for url in old_keys.keys() | keys.keys():
+            if old_keys.get(url) != keys.get(url):
+                old_tf = old_frequencies.get(old_keys.get(url), {})
+                tf = new_frequencies.get(keys.get(url), {})
+                terms.update(t for t in old_tf.keys() | tf.keys() if old_tf.get(t) != tf.get(t))
+        if old_search.get("gramShards") == gram_shards:
+            old_vocabulary = set().union(*(old_frequencies[key] for key in old_keys.values()))
+            grams = {
+                gram_shard(gram, gram_shards)
+                for term in old_vocabulary ^ vocabulary
+                for gram in term_trigrams(term)
+            }
+
+    (output / "search").mkdir(exist_ok=True)
+    for name, text in search_files(posts, ids, frequencies, terms, grams).items():
+        if is_stale(output / name, hash_content(text)):
+            with open(output / name, "w", encoding="utf-8") as f:
+                f.write(text)
+    # Shards nothing changed in are left as the previous build wrote them;
+    # compress_outputs registers their .gz and .br siblings again
+    rebuilt_shards = set()
+    if terms is not None:
+        rebuilt_shards.update(f"search/{shard_name('t', term[:2])}" for term in terms)
+    if grams is not None:
+        rebuilt_shards.update(f"search/{shard_name('g', str(number))}" for number in grams)
+    kept_kinds = tuple(
+        prefix
+        for prefix, built in (("search/t-", terms), ("search/g-", grams))
+        if built is not None
+    )
+    for rel in old_shards:
+        if rel.startswith(kept_kinds) and rel not in rebuilt_shards and rel not in new_outputs:
+            new_outputs[rel] = old_outputs[rel]
+    search_manifest = {
+        "code": code_digest,
+        "ids": ids,
+        "posts": keys,
+        "terms": new_frequencies,
+        "gramShards": gram_shards,
+    }
+    lap("search")
+
+    about_path = base / "about.qmd"
+    about_source = about_path.read_bytes() if about_path.exists() else b""
+    about_digest = hash_content(
+        code_digest, about_source, json.dumps(image_sizes.get("profile.jpg"))
+    )
+    if is_stale(output / "about.html", about_digest):
+        generate_about_page(base_dir, output_dir, image_sizes)
+
+    if is_stale(output / "search.js", code_digest):
+        with open(output / "search.js", "w", encoding="utf-8") as f:
+            f.write(SEARCH_JS)
+
+    if is_stale(output / "mathjax-config.js", code_digest):
+        with open(output / "mathjax-config.js", "w", encoding="utf-8") as f:
+            f.write(MATHJAX_CONFIG_JS)
+    lap("pages")
+
+    if minify:
+        saved = minify_outputs(output_dir, list(rebuilt))
+        if saved:
+            report = ", ".join(f"{kind} -{n / 1024:.1f} KB" for kind, n in saved.items())
+            print(f"Minified: {report}")
+        lap("minify")
+
+    if compress:
+        compress_outputs(output_dir, new_outputs, is_stale)
+        lap("compression")
+
+    removed = remove_stale_outputs(output_dir, old_outputs, new_outputs)
+    save_manifest(
+        manifest_path, output, new_outputs, new_sources, new_dimensions, search_manifest
+    )
+    lap("manifest")
+
+    if incremental:
+        print(
+            f"Incremental build: {len(rebuilt)} outputs rebuilt, "
+            f"{len(new_outputs) - len(rebuilt)} unchanged, {removed} removed."
+        )
     print(f"Site built successfully! {len(posts)} posts generated.")
     print(f"Output directory: {output_dir}")
+    return posts
 
 
 if __name__ == "__main__":
     base_dir = os.path.dirname(os.path.abspath(__file__))
-    output_dir = os.path.join(base_dir, "_site")
 
-    build_site(base_dir, output_dir)
+    parser = argparse.ArgumentParser(description="Build the blog into a static site")
+    parser.add_argument(
+        "--incremental",
+        action="store_true",
+        help="only rebuild outputs whose inputs changed since the last build",
+    )
+    parser.add_argument(
+        "--jobs",
+        "-j",
+        type=int,
+        default=1,
+        help="render posts on N worker processes (0 = one per CPU core)",
+    )
+    parser.add_argument(
+        "--page-size",
+        type=int,
+        default=LISTING_PAGE_SIZE,
+        help="posts per listing page (0 = put every post on one page)",
+    )
+    parser.add_argument(
+        "--assets",
+        choices=ASSET_MODES,
+        default="reflink",
+        help="publish assets as copies, copy-on-write reflinks or hardlinks "
+        "(default: reflink, falling back to a copy)",
+    )
+    parser.add_argument(
+        "--minify",
+        action="store_true",
+        help="strip insignificant whitespace from HTML, CSS and JS outputs",
+    )
+    parser.add_argument(
+        "--no-compress",
+        action="store_true",
+        help="skip writing precompressed .gz/.br siblings of text outputs",
+    )
+    parser.add_argument(
+        "--trace",
+        nargs="?",
+        const="build_trace.json",
+        metavar="FILE",
+        help="record a Chrome trace of the build to FILE (default: build_trace.json) "
+        "and print the slowest pages",
+    )
+    parser.add_argument(
+        "--profile-memory",
+        nargs="?",
+        const=10,
+        type=int,
+        metavar="N",
+        help="report peak memory per build stage and for rendering the N "
+        "largest posts (default: 10); the build runs on one process",
+    )
+    parser.add_argument(
+        "--output", default=os.path.join(base_dir, "_site"), help="output directory"
+    )
+    args = parser.parse_args()
+    jobs = args.jobs if args.jobs > 0 else os.cpu_count() or 1
+
+    if args.trace:
+        start_trace()
+
+    memory = None
+    if args.profile_memory is not None:
+        # Worker processes are outside tracemalloc's view
+        jobs = 1
+        memory = {}
+        tracemalloc.start()
+
+    build_site(
+        base_dir,
+        args.output,
+        incremental=args.incremental,
+        jobs=jobs,
+        page_size=args.page_size,
+        asset_mode=args.assets,
+        compress=not args.no_compress,
+        minify=args.minify,
+        memory=memory,
+    )
+
+    if memory is not None:
+        print("\n🧠 Memory by build stage (tracemalloc):")
+        print(f"  {'stage':14}{'peak':>12}{'retained':>12}")
+        for stage, usage in memory.items():
+            print(
+                f"  {stage:14}{usage['peak'] / 2**20:9.1f} MB"
+                f"{usage['retained'] / 2**20:+9.1f} MB"
+            )
+        build_peak = max((usage["peak"] for usage in memory.values()), default=0)
+        print(f"  build peak: {build_peak / 2**20:.1f} MB")
+
+        rows = largest_posts_memory(get_all_posts(base_dir), args.profile_memory)
+        print(f"\n🧠 Rendering the {len(rows)} largest posts:")
+        print(f"  {'page':48}{'source':>10}{'peak':>12}")
+        for page, size, peak in rows:
+            print(f"  {page:48}{size / 1024:7.1f} KB{peak / 2**20:9.2f} MB")
+        tracemalloc.stop()
+
+    if args.trace:
+        events = stop_trace()
+        write_trace(args.trace, events)
+        pages = page_times(events)
+        print(f"\n🐢 Slowest of {len(pages)} pages rendered:")
+        print(f"  {'page':48}{'total':>10}{'md_to_html':>12}")
+        for page, total, markdown in pages[:15]:
+            print(f"  {page:48}{total:8.1f}ms{markdown:10.1f}ms")
+        print(f"📈 Trace written to {args.trace} (open in chrome://tracing or Perfetto)")
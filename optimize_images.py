@@ -4,10 +4,18 @@ Image optimization script for the blog
 - Resizes large images to web-friendly sizes
 - Keeps aspect ratio
 - Overwrites images in _site directory
+- Caches optimized images by source hash and settings, so each image is
+  only re-encoded once
+- Makes the responsive WebP/AVIF variants build_simple.py links from
+  <picture> elements
 """
 
 import os
 import sys
+import shutil
+import hashlib
+import argparse
+from concurrent.futures import ProcessPoolExecutor, FIRST_COMPLETED, wait
 from pathlib import Path
 
 # Try to import Pillow, fallback to warning if not available
@@ -22,12 +30,23 @@ except ImportError:
         "Will skip image optimization. Site will still work but images will be larger."
     )
 
+CACHE_DIR = Path(".image_cache")
+# Bump to invalidate every cached image when the encoding below changes
+CACHE_VERSION = 1
+# Decoded pixels of all images being processed at once stay under this
+MEMORY_BUDGET_MB = 512
+# Widths of the responsive variants made for post images, and their quality
+RESPONSIVE_WIDTHS = (480, 800, 1200)
+VARIANT_QUALITY = 80
 
-def optimize_image(image_path, max_width=1200, quality=85):
-    """Optimize a single image"""
+
+def optimize_image(image_path, max_width=1200, quality=85, output_path=None):
+    """Optimize a single image, in place or into output_path"""
     if not HAS_PILLOW:
         return False
 
+    output_path = Path(output_path or image_path)
+
     try:
         with Image.open(image_path) as img:
             # Convert to RGB if necessary
@@ -49,78 +68,226 @@ def optimize_image(image_path, max_width=1200, quality=85):
             # Resize image
             img = img.resize((new_width, new_height), Image.Resampling.LANCZOS)
 
-            # Save optimized image
-            if image_path.suffix.lower() == ".png":
-                img.save(image_path, optimize=True)
+            # Save optimized image next to its destination and swap it in, so
+            # an asset hardlinked to its source (build_simple.py --assets
+            # hardlink) never has the source overwritten
+            tmp_path = output_path.with_name(f".tmp-{output_path.name}")
+            if output_path.suffix.lower() == ".png":
+                img.save(tmp_path, optimize=True)
             else:
-                img.save(image_path, quality=quality, optimize=True)
+                img.save(tmp_path, quality=quality, optimize=True)
+            os.replace(tmp_path, output_path)
 
             return True
     except Exception as e:
-        print(f"  Error processing {image_path.name}: {e}")
+        print(f"  Error processing {Path(image_path).name}: {e}")
         return False
 
 
-def optimize_all_images():
-    """Optimize all images in _site directory"""
+def file_digest(path):
+    """Return the hex digest of a file's contents"""
+    h = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(1 << 20), b""):
+            h.update(chunk)
+    return h.hexdigest()
+
+
+def cache_key(digest, max_width, quality, fmt=""):
+    """Cache key of an image's contents optimized with the given settings"""
+    settings = f"{digest}:{max_width}:{quality}:{fmt}:{CACHE_VERSION}"
+    return hashlib.sha256(settings.encode("utf-8")).hexdigest()
+
+
+def estimate_memory(image_path):
+    """Rough bytes needed to decode and resize an image (header read only)"""
+    try:
+        with Image.open(image_path) as img:
+            width, height = img.size
+    except Exception:
+        return 0
+    # RGBA source plus the resized copy
+    return width * height * 4 * 2
+
+
+def install_image(cached_path, image_path):
+    """Replace image_path with the cached optimized image"""
+    tmp_path = image_path.with_name(f".tmp-{image_path.name}")
+    if tmp_path.exists():
+        tmp_path.unlink()
+    try:
+        os.link(cached_path, tmp_path)
+    except OSError:
+        shutil.copyfile(cached_path, tmp_path)
+    os.replace(tmp_path, image_path)
+
+
+def variant_formats():
+    """Modern formats the local Pillow can encode, best first"""
+    if not HAS_PILLOW:
+        return []
+    extensions = Image.registered_extensions()
+    return [fmt for fmt in ("avif", "webp") if extensions.get(f".{fmt}") in Image.SAVE]
+
+
+def variant_widths(image_path, widths=RESPONSIVE_WIDTHS):
+    """Widths to make variants of an image at: every responsive width below
+    its own, plus its own width when that is not above the largest"""
+    with Image.open(image_path) as img:
+        width = img.size[0]
+    chosen = [w for w in widths if w < width]
+    if width <= max(widths):
+        chosen.append(width)
+    return chosen
+
+
+def variant_cache_path(digest, width, fmt, cache_dir=CACHE_DIR):
+    """Where the cache keeps an image's variant at width encoded as fmt"""
+    key = cache_key(digest, width, VARIANT_QUALITY, fmt)
+    return Path(cache_dir) / f"{key}.{fmt}"
+
+
+def encode_variant(image_path, width, fmt, cached_path):
+    """Encode image_path scaled to width as fmt into cached_path; False if
+    the image could not be read or encoded"""
+    cached_path = Path(cached_path)
+    try:
+        with Image.open(image_path) as img:
+            # Both modern formats keep transparency
+            img = img.convert("RGBA" if img.mode in ("RGBA", "LA", "P") else "RGB")
+            if img.size[0] != width:
+                height = round(img.size[1] * width / img.size[0])
+                img = img.resize((width, height), Image.Resampling.LANCZOS)
+            tmp_path = cached_path.with_name(f".tmp-{cached_path.name}")
+            img.save(tmp_path, format=fmt.upper(), quality=VARIANT_QUALITY)
+            os.replace(tmp_path, cached_path)
+        return True
+    except Exception as e:
+        print(f"  Error encoding {Path(image_path).name} as {fmt}: {e}")
+        return False
+
+
+def find_images(site_dir):
+    """List (image path, max_width) for post images and the profile image"""
+    images = []
+    for img_dir in sorted(site_dir.rglob("*_images")):
+        if not img_dir.is_dir():
+            continue
+        for img_path in sorted(img_dir.iterdir()):
+            if img_path.suffix.lower() in [".png", ".jpg", ".jpeg"]:
+                images.append((img_path, 1200))
+
+    profile = site_dir / "profile.jpg"
+    if profile.exists():
+        images.append((profile, 400))
+    return images
+
+
+def run_with_memory_budget(tasks, jobs, memory_budget, worker=optimize_image):
+    """Run tasks on a process pool, keeping the estimated memory of running
+    tasks in budget
+
+    A task's first four entries are worker's arguments, by default
+    (image path, max_width, quality, output path), and its fifth the memory
+    it needs. Yields each task with worker's result as tasks finish.
+    """
+    pending = list(tasks)
+    running = {}
+    in_use = 0
+    with ProcessPoolExecutor(max_workers=jobs) as pool:
+        while pending or running:
+            # Always start at least one task, even one larger than the budget
+            while pending and len(running) < jobs:
+                memory = pending[0][4]
+                if running and in_use + memory > memory_budget:
+                    break
+                task = pending.pop(0)
+                future = pool.submit(worker, *task[:4])
+                running[future] = task
+                in_use += memory
+
+            done, _ = wait(running, return_when=FIRST_COMPLETED)
+            for future in done:
+                task = running.pop(future)
+                in_use -= task[4]
+                yield task, future.result()
+
+
+def optimize_all_images(
+    site_dir="_site",
+    cache_dir=CACHE_DIR,
+    quality=85,
+    jobs=1,
+    memory_budget=MEMORY_BUDGET_MB << 20,
+):
+    """Optimize all images in _site directory, reusing cached results"""
     if not HAS_PILLOW:
         print("\n✗ Image optimization skipped (Pillow not available)")
         return False
 
-    site_dir = Path("_site")
+    site_dir = Path(site_dir)
     if not site_dir.exists():
         print("✗ _site directory not found. Run build_simple.py first.")
         return False
 
+    cache_dir = Path(cache_dir)
+    cache_dir.mkdir(exist_ok=True)
+
     print("🔍 Optimizing images for web...")
 
     optimized_count = 0
+    cached_count = 0
     total_saved = 0
-
-    # Find all image directories
-    for img_dir in site_dir.rglob("*_images"):
-        if not img_dir.is_dir():
+    misses = []
+    original_sizes = {}
+
+    # A ".skip" marker records an image that needs no work: one already
+    # small enough, or the output of an earlier optimization
+    for img_path, max_width in find_images(site_dir):
+        key = cache_key(file_digest(img_path), max_width, quality)
+        cached_path = cache_dir / f"{key}{img_path.suffix.lower()}"
+        original_sizes[img_path] = img_path.stat().st_size
+
+        if (cache_dir / f"{key}.skip").exists():
+            size_kb = original_sizes[img_path] / 1024
+            print(f"  ✓ {img_path.relative_to(site_dir)}: {size_kb:.0f}KB (no change)")
+        elif cached_path.exists():
+            install_image(cached_path, img_path)
+            saved = original_sizes[img_path] - img_path.stat().st_size
+            total_saved += saved
+            cached_count += 1
+            print(
+                f"  ♻️  {img_path.relative_to(site_dir)}: saved {saved / 1024:.1f}KB (cached)"
+            )
+        else:
+            misses.append(
+                (img_path, max_width, quality, cached_path, estimate_memory(img_path), key)
+            )
+
+    if misses:
+        print(f"\n🔧 Encoding {len(misses)} new images on {jobs} workers...")
+
+    for task, optimized in run_with_memory_budget(misses, jobs, memory_budget):
+        img_path, max_width, quality, cached_path, _, key = task
+        if not optimized:
+            (cache_dir / f"{key}.skip").touch()
+            size_kb = original_sizes[img_path] / 1024
+            print(f"  ✓ {img_path.relative_to(site_dir)}: {size_kb:.0f}KB (no change)")
             continue
 
-        print(f"\n📁 Processing {img_dir.relative_to(site_dir)}/")
-
-        for img_path in img_dir.iterdir():
-            if img_path.suffix.lower() not in [".png", ".jpg", ".jpeg"]:
-                continue
-
-            original_size = img_path.stat().st_size
+        # Never re-encode our own output if it is optimized again
+        output_key = cache_key(file_digest(cached_path), max_width, quality)
+        (cache_dir / f"{output_key}.skip").touch()
 
-            if optimize_image(img_path):
-                new_size = img_path.stat().st_size
-                saved = original_size - new_size
-                total_saved += saved
-                optimized_count += 1
+        install_image(cached_path, img_path)
+        saved = original_sizes[img_path] - img_path.stat().st_size
+        total_saved += saved
+        optimized_count += 1
+        print(f"  🔧 {img_path.relative_to(site_dir)}: saved {saved / 1024:.1f}KB")
 
-                saved_kb = saved / 1024
-                print(f"  🔧 {img_path.name}: saved {saved_kb:.1f}KB")
-            else:
-                size_kb = original_size / 1024
-                print(f"  ✓ {img_path.name}: {size_kb:.0f}KB (no change)")
-
-    # Optimize profile image
-    profile = site_dir / "profile.jpg"
-    if profile.exists():
-        original_size = profile.stat().st_size
-        if optimize_image(profile, max_width=400):
-            new_size = profile.stat().st_size
-            saved = original_size - new_size
-            total_saved += saved
-            optimized_count += 1
-
-            saved_kb = saved / 1024
-            print(f"  🔧 profile.jpg: saved {saved_kb:.1f}KB")
-        else:
-            size_kb = original_size / 1024
-            print(f"  ✓ profile.jpg: {size_kb:.0f}KB (no change)")
-
-    if optimized_count > 0:
+    if optimized_count or cached_count:
         total_saved_mb = total_saved / 1024 / 1024
-        print(f"\n✅ Optimized {optimized_count} images")
+        print(f"\n✅ Optimized {optimized_count} images ({cached_count} from cache)")
         print(f"💾 Saved {total_saved_mb:.2f} MB total")
     else:
         print("\n✓ No images needed optimization")
@@ -132,13 +299,34 @@ if __name__ == "__main__":
     print("🖼️ Blog Image Optimizer")
     print("=" * 50)
 
+    parser = argparse.ArgumentParser(description="Optimize the images in _site")
+    parser.add_argument(
+        "--jobs",
+        "-j",
+        type=int,
+        default=0,
+        help="encode images on N worker processes (0 = one per CPU core)",
+    )
+    parser.add_argument(
+        "--memory-budget",
+        type=int,
+        default=MEMORY_BUDGET_MB,
+        help="MB of decoded pixels allowed in flight across workers",
+    )
+    parser.add_argument("--quality", type=int, default=85, help="JPEG quality")
+    args = parser.parse_args()
+
     if not HAS_PILLOW:
         print("\n⚠️  Pillow not installed. Install with:")
         print("   pip install Pillow\n")
         print("Continuing without optimization...")
         sys.exit(0)
 
-    optimize_all_images()
+    optimize_all_images(
+        quality=args.quality,
+        jobs=args.jobs if args.jobs > 0 else os.cpu_count() or 1,
+        memory_budget=args.memory_budget << 20,
+    )
 
     print("\n" + "=" * 50)
     print("✨ Image optimization complete!")
@@ -0,0 +1,555 @@
+#!/usr/bin/env python3
+"""
+Local preview server for the blog
+- Serves _site on http://localhost:8000
+- Watches posts, about.qmd and the stylesheets and rebuilds incrementally,
+  rewriting just the page and listings of an edited post
+- Reloads open browser tabs after each rebuild through an injected client
+- With --in-memory, renders pages on request instead of writing _site
+- With --no-watch, serves the build's precompressed .br/.gz files to
+  clients accepting them
+"""
+
+import io
+import os
+import json
+import sys
+import time
+import argparse
+import mimetypes
+import threading
+from functools import partial
+from http.server import SimpleHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from urllib.parse import unquote, urlsplit
+
+from build_simple import (
+    LISTING_PAGE_SIZE,
+    MATHJAX_CONFIG_JS,
+    SEARCH_JS,
+    build_site,
+    collect_assets,
+    generate_listing,
+    get_all_posts,
+    hash_content,
+    listing_digest,
+    listing_pages,
+    post_entry,
+    post_files,
+    read_frontmatter,
+    read_image_size,
+    render_about_page,
+    render_post_page,
+    render_posts,
+    search_files,
+    write_listing,
+)
+
+# Sources whose changes trigger a rebuild (directories are watched recursively)
+WATCHED_PATHS = [
+    "research",
+    "books",
+    "about.qmd",
+    "styles_simple.css",
+    "styles.css",
+    "profile.jpg",
+    "cv",
+]
+POLL_INTERVAL = 0.25
+# A burst of saves is rebuilt once, after it has been quiet this long
+DEBOUNCE = 0.2
+# Watch mode rewrites a saved post's page and listings at once; the search
+# index and build manifest catch up in an incremental build once the
+# sources have been quiet this long
+IDLE_BUILD_DELAY = 2.0
+
+LIVE_RELOAD_PATH = "/__livereload"
+LIVE_RELOAD_CLIENT = f"""<script>
+new EventSource("{LIVE_RELOAD_PATH}").onmessage = function () {{ location.reload(); }};
+</script>
+"""
+
+# Bumped after every rebuild; live-reload connections wait on it
+site_version = 0
+site_changed = threading.Condition()
+
+
+def snapshot(base_dir):
+    """Map every watched file to its (mtime_ns, size)"""
+    base = Path(base_dir)
+    files = {}
+    for name in WATCHED_PATHS:
+        path = base / name
+        if path.is_file():
+            candidates = [path]
+        elif path.is_dir():
+            candidates = [p for p in path.rglob("*") if p.is_file()]
+        else:
+            continue
+        for candidate in candidates:
+            try:
+                stat = candidate.stat()
+            except OSError:
+                continue
+            files[candidate] = (stat.st_mtime_ns, stat.st_size)
+    return files
+
+
+def changed_files(before, after):
+    """Files added, removed or modified between two snapshots"""
+    return sorted(
+        path
+        for path in before.keys() | after.keys()
+        if before.get(path) != after.get(path)
+    )
+
+
+def notify_reload():
+    """Tell every connected live-reload client that the site changed"""
+    global site_version
+    with site_changed:
+        site_version += 1
+        site_changed.notify_all()
+
+
+def watch(base_dir, on_change):
+    """Poll the watched sources forever, calling on_change(changed files)
+    once after each burst of changes"""
+    base = Path(base_dir)
+    current = snapshot(base_dir)
+    while True:
+        time.sleep(POLL_INTERVAL)
+        latest = snapshot(base_dir)
+        if latest == current:
+            continue
+
+        # Wait for the burst to settle so one save = one rebuild
+        while True:
+            time.sleep(DEBOUNCE)
+            settled = snapshot(base_dir)
+            if settled == latest:
+                break
+            latest = settled
+
+        changed = changed_files(current, latest)
+        current = latest
+        names = ", ".join(str(p.relative_to(base)) for p in changed[:3])
+        if len(changed) > 3:
+            names += f" and {len(changed) - 3} more"
+        print(f"\n🔄 Changed: {names}")
+
+        start = time.perf_counter()
+        try:
+            on_change(changed)
+        except Exception as e:
+            print(f"✗ Rebuild failed: {e}")
+            continue
+        print(f"⚡ Updated in {(time.perf_counter() - start) * 1000:.0f} ms")
+        notify_reload()
+
+
+def discover_site(base_dir, page_size=LISTING_PAGE_SIZE):
+    """Find every page and file of the site without rendering anything
+
+    Returns the site state: the posts, a route for every site path, the
+    site paths of each post's images and an empty cache of responses.
+    """
+    base = Path(base_dir)
+    output = base / "_site"  # only used to name routes, never written
+    posts = get_all_posts(base_dir)
+    routes = {"about.html": ("about", None)}
+    image_dirs = {}
+    for src, dst in collect_assets(base_dir, output):
+        path = dst.relative_to(output).as_posix()
+        routes[path] = ("file", src)
+        image_dirs.setdefault(path.split("/")[0], []).append(path)
+    for post in posts:
+        routes[f"{post['section']}_{post['slug']}.html"] = ("post", post)
+    for name, listing in listing_pages(posts, page_size):
+        routes[name] = ("listing", listing)
+    return {
+        "base": base,
+        "posts": posts,
+        "routes": routes,
+        "image_dirs": image_dirs,
+        "search": None,
+        "cache": {},
+    }
+
+
+def image_sizes(site, paths):
+    """Header-read sizes of the site's images at paths"""
+    sizes = {}
+    for path in paths:
+        size = read_image_size(site["routes"][path][1])
+        if size:
+            sizes[path] = list(size)
+    return sizes
+
+
+def post_images(site, post):
+    """Site paths of a post's images"""
+    return site["image_dirs"].get(f"{post['section']}_{post['slug']}_images", [])
+
+
+def render(site, path):
+    """Produce (body, content type, source files) for a site path, or None
+
+    The source files are what invalidates the response; None stands for
+    any change to the site's sources.
+    """
+    route = site["routes"].get(path)
+    if route is None:
+        if path == "search.js":
+            return SEARCH_JS.encode(), "text/javascript", set()
+        if path == "mathjax-config.js":
+            return MATHJAX_CONFIG_JS.encode(), "text/javascript", set()
+        if path == "search-index.json" or path.startswith("search/"):
+            if site["search"] is None:
+                site["search"] = search_files(site["posts"])
+            text = site["search"].get(path)
+            if text is not None:
+                return text.encode(), "application/json", None
+        return None
+
+    kind, source = route
+    if kind == "file":
+        content_type = mimetypes.guess_type(path)[0] or "application/octet-stream"
+        return Path(source).read_bytes(), content_type, {Path(source)}
+
+    if kind == "post":
+        images = post_images(site, source)
+        source.setdefault("image_sizes", image_sizes(site, images))
+        sources = {Path(source["path"])} | {site["routes"][p][1] for p in images}
+        return render_post_page(source).encode(), "text/html", sources
+
+    if kind == "listing":
+        for post in source["posts"]:
+            post.setdefault("image_sizes", image_sizes(site, post_images(site, post)))
+        buffer = io.StringIO()
+        write_listing(buffer, **source)
+        return buffer.getvalue().encode(), "text/html", None
+
+    profile = ["profile.jpg"] if "profile.jpg" in site["routes"] else []
+    html = render_about_page(site["base"], image_sizes(site, profile))
+    return html.encode(), "text/html", None
+
+
+def refresh_site(site, changed, page_size=LISTING_PAGE_SIZE):
+    """Rediscover the site after changed files, keeping the cached responses
+    none of them affect"""
+    fresh = discover_site(site["base"], page_size)
+    changed = set(changed)
+    for path, (body, content_type, sources) in site["cache"].items():
+        if sources is not None and path in fresh["routes"] and not sources & changed:
+            fresh["cache"][path] = (body, content_type, sources)
+    return fresh
+
+
+class PreviewHandler(SimpleHTTPRequestHandler):
+    """Serve the site, adding the live-reload client to every HTML page"""
+
+    live_reload = True
+
+    def do_GET(self):
+        if self.live_reload and self.path == LIVE_RELOAD_PATH:
+            self.stream_reloads()
+            return
+
+        path = self.translate_path(self.path)
+        if os.path.isdir(path):
+            path = os.path.join(path, "index.html")
+        if self.live_reload and path.endswith(".html") and os.path.isfile(path):
+            with open(path, "rb") as f:
+                self.send_page(f.read(), "text/html")
+        elif not self.send_precompressed(path):
+            super().do_GET()
+
+    def accepted_encodings(self):
+        """Content codings the client accepts (ignoring any with q=0)"""
+        accepted = set()
+        for item in self.headers.get("Accept-Encoding", "").split(","):
+            coding, _, params = item.partition(";")
+            name, _, value = params.strip().partition("=")
+            try:
+                quality = float(value) if name.strip() == "q" else 1.0
+            except ValueError:
+                quality = 1.0
+            if quality > 0:
+                accepted.add(coding.strip().lower())
+        return accepted
+
+    def send_precompressed(self, path):
+        """Send the build's .br or .gz sibling of path if the client accepts
+        it and it is current; False if there is none to send"""
+        if not os.path.isfile(path):
+            return False
+        accepted = self.accepted_encodings()
+        for coding, suffix in (("br", ".br"), ("gzip", ".gz")):
+            sibling = path + suffix
+            if coding not in accepted or not os.path.isfile(sibling):
+                continue
+            if os.path.getmtime(sibling) < os.path.getmtime(path):
+                continue
+            with open(sibling, "rb") as f:
+                body = f.read()
+            self.send_response(200)
+            self.send_header("Content-Type", self.guess_type(path))
+            self.send_header("Content-Encoding", coding)
+            self.send_header("Content-Length", str(len(body)))
+            self.send_header("Vary", "Accept-Encoding")
+            self.end_headers()
+            self.wfile.write(body)
+            return True
+        return False
+
+    def send_page(self, body, content_type, head_only=False):
+        """Send a complete response, with the live-reload client in HTML"""
+        if self.live_reload and content_type == "text/html":
+            body = body.replace(b"</body>", LIVE_RELOAD_CLIENT.encode() + b"</body>", 1)
+        if content_type.startswith("text/"):
+            content_type += "; charset=utf-8"
+        self.send_response(200)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(body)))
+        self.send_header("Cache-Control", "no-cache")
+        self.end_headers()
+        if not head_only:
+            self.wfile.write(body)
+
+    def stream_reloads(self):
+        """Hold a server-sent-events stream open, sending one event per rebuild"""
+        self.send_response(200)
+        self.send_header("Content-Type", "text/event-stream")
+        self.send_header("Cache-Control", "no-cache")
+        self.end_headers()
+        with site_changed:
+            seen = site_version
+        try:
+            while True:
+                with site_changed:
+                    site_changed.wait_for(lambda: site_version != seen, timeout=15)
+                    version = site_version
+                if version != seen:
+                    seen = version
+                    self.wfile.write(b"data: reload\n\n")
+                else:
+                    self.wfile.write(b": keep-alive\n\n")
+                self.wfile.flush()
+        except (BrokenPipeError, ConnectionResetError):
+            pass
+
+    def log_message(self, format, *args):
+        if self.path != LIVE_RELOAD_PATH:
+            super().log_message(format, *args)
+
+
+class InMemoryHandler(PreviewHandler):
+    """Serve pages rendered on first request from server.site, never from disk"""
+
+    def do_GET(self):
+        if self.path == LIVE_RELOAD_PATH:
+            self.stream_reloads()
+            return
+        self.send_rendered()
+
+    def do_HEAD(self):
+        self.send_rendered(head_only=True)
+
+    def send_rendered(self, head_only=False):
+        path = unquote(urlsplit(self.path).path).lstrip("/")
+        if path == "" or path.endswith("/"):
+            path += "index.html"
+
+        site = self.server.site
+        response = site["cache"].get(path)
+        if response is None:
+            response = render(site, path)
+            if response is None:
+                self.send_error(404, "File not found")
+                return
+            site["cache"][path] = response
+        body, content_type, _ = response
+        self.send_page(body, content_type, head_only)
+
+
+def make_server(port, output_dir=None, site=None, live_reload=True):
+    """Create the preview server for _site, or for an in-memory site"""
+    if site is not None:
+        handler = InMemoryHandler
+    else:
+        handler = partial(PreviewHandler, directory=str(output_dir))
+    PreviewHandler.live_reload = live_reload
+    server = ThreadingHTTPServer(("localhost", port), handler)
+    server.daemon_threads = True
+    server.site = site
+    return server
+
+
+def serve(server, description):
+    """Serve until interrupted"""
+    print(f"🌐 Serving {description} on http://localhost:{server.server_address[1]}")
+    print("Press Ctrl+C to stop")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        print("\n👋 Preview stopped")
+    finally:
+        server.server_close()
+
+
+def edited_posts(posts, changed):
+    """The posts whose index.qmd is among the changed files, or None when
+    anything else changed: new or deleted posts, images, stylesheets, ..."""
+    by_path = {Path(post["path"]): post for post in posts}
+    if not changed or any(path not in by_path or not path.is_file() for path in changed):
+        return None
+    return [by_path[path] for path in changed]
+
+
+def listing_contents(posts, page_size):
+    """Digest of what each listing page shows, by file name"""
+    return {
+        name: hash_content(
+            listing_digest("", listing["posts"]), json.dumps(listing["categories"])
+        )
+        for name, listing in listing_pages(posts, page_size)
+    }
+
+
+def rebuild_posts(base_dir, posts, changed, output_dir, page_size=LISTING_PAGE_SIZE):
+    """Rewrite the pages of edited posts and the listing pages they change
+
+    posts are the posts of the last build (see build_site); returns them
+    updated, or None, having written nothing, when the changed files are
+    not all edits to existing posts.
+    """
+    stale = edited_posts(posts, changed)
+    if stale is None:
+        return None
+    before = listing_contents(posts, page_size)
+    edited = {}
+    for post in stale:
+        frontmatter, body_offset = read_frontmatter(post["path"])
+        fresh = post_entry(post["section"], post["path"], frontmatter, body_offset)
+        # Only index.qmd changed, so the post's images are as they were
+        fresh["image_variants"] = post["image_variants"]
+        fresh["image_sizes"] = post["image_sizes"]
+        edited[Path(post["path"])] = fresh
+    # Sorted as get_all_posts sorts them, posts sharing a date included
+    by_path = {Path(post["path"]): post for post in posts} | edited
+    posts = [by_path[path] for _, path in post_files(base_dir) if path in by_path]
+    posts.sort(key=lambda x: x["date"], reverse=True)
+
+    render_posts(list(edited.values()), output_dir)
+    after = listing_contents(posts, page_size)
+    for name, listing in listing_pages(posts, page_size):
+        if before.get(name) != after[name]:
+            generate_listing(output_path=Path(output_dir) / name, **listing)
+    return posts
+
+
+def watch_builds(base_dir, output_dir, jobs=1, page_size=LISTING_PAGE_SIZE):
+    """Build _site and return the watch() callback that keeps it current
+
+    Edits to posts only rewrite their pages and listings; other changes run
+    an incremental build. Neither compresses its outputs, which the preview
+    serves uncompressed, and the search index is brought up to date by an
+    incremental build once the sources have been quiet for IDLE_BUILD_DELAY.
+    """
+    lock = threading.Lock()
+    state = {"timer": None}
+
+    def build():
+        with lock:
+            state["posts"] = build_site(
+                base_dir,
+                output_dir,
+                incremental=True,
+                jobs=jobs,
+                page_size=page_size,
+                compress=False,
+            )
+
+    def on_change(changed):
+        if state["timer"] is not None:
+            state["timer"].cancel()
+        with lock:
+            posts = rebuild_posts(base_dir, state["posts"], changed, output_dir, page_size)
+            if posts is not None:
+                state["posts"] = posts
+        if posts is None:
+            build()
+            return
+        state["timer"] = threading.Timer(IDLE_BUILD_DELAY, build)
+        state["timer"].daemon = True
+        state["timer"].start()
+
+    build()
+    return on_change
+
+
+def start_watching(base_dir, on_change):
+    """Run watch() on a background thread"""
+    threading.Thread(target=watch, args=(base_dir, on_change), daemon=True).start()
+    print("👀 Watching research/, books/, about.qmd and the stylesheets")
+
+
+if __name__ == "__main__":
+    base_dir = os.path.dirname(os.path.abspath(__file__))
+
+    parser = argparse.ArgumentParser(description="Preview the blog locally")
+    parser.add_argument("--port", type=int, default=8000, help="port to serve on")
+    parser.add_argument(
+        "--no-watch",
+        action="store_true",
+        help="serve _site as it is, without rebuilding or live reload",
+    )
+    parser.add_argument(
+        "--in-memory",
+        action="store_true",
+        help="render pages when they are requested instead of building _site",
+    )
+    parser.add_argument(
+        "--jobs",
+        "-j",
+        type=int,
+        default=1,
+        help="render posts on N worker processes (0 = one per CPU core)",
+    )
+    parser.add_argument(
+        "--page-size",
+        type=int,
+        default=LISTING_PAGE_SIZE,
+        help="posts per listing page (0 = put every post on one page)",
+    )
+    parser.add_argument(
+        "--output", default=os.path.join(base_dir, "_site"), help="output directory"
+    )
+    args = parser.parse_args()
+    jobs = args.jobs if args.jobs > 0 else os.cpu_count() or 1
+
+    if args.in_memory:
+        start = time.perf_counter()
+        site = discover_site(base_dir, args.page_size)
+        print(
+            f"🔍 Found {len(site['posts'])} posts in "
+            f"{(time.perf_counter() - start) * 1000:.0f} ms"
+        )
+        server = make_server(args.port, site=site)
+
+        def refresh(changed):
+            server.site = refresh_site(server.site, changed, args.page_size)
+
+        start_watching(base_dir, refresh)
+        serve(server, "pages from memory")
+    elif args.no_watch:
+        if not os.path.isdir(args.output):
+            print("✗ _site directory not found. Run build_simple.py first.")
+            sys.exit(1)
+        serve(make_server(args.port, args.output, live_reload=False), args.output)
+    else:
+        start_watching(
+            base_dir, watch_builds(base_dir, args.output, jobs, args.page_size)
+        )
+        serve(make_server(args.port, args.output), args.output)
@@ -1,9 +1,8 @@
 #!/bin/bash
-# Quick local preview
+# Quick local preview: rebuilds on save and reloads the browser
 
 echo "🌐 Starting local preview..."
 echo "Opening http://localhost:8000"
-echo "Press Ctrl+C to stop"
 echo ""
 
-cd _site && python3 -m http.server 8000
+cd "$(dirname "$0")" && python3 preview.py "$@"
@@ -0,0 +1,481 @@
+#!/usr/bin/env python3
+"""
+Behaviour checks for build_simple.py's hand-written parsers and builders
+- Markdown: emphasis, links, images and fenced code; heading anchors and
+  the table of contents; the plain-text fallback past the time limit
+- Frontmatter: YAML comments, lists and nested maps; read_frontmatter's
+  body offset agrees with parse_frontmatter, CRLF files included, and is
+  cached until a post file's stat changes
+- Minifiers: whitespace collapsed outside code, scripts and math
+- Parallel rendering: --jobs output identical to a serial build
+- Listing pagination: page split, page file names and prev/next links
+- Asset publishing: hardlink and reflink modes falling back to a copy
+- Incremental builds: no-op rebuilds, edited and deleted posts, unchanged
+  assets left alone, outputs sharing a parent directory
+- Precompression: .gz siblings written, and skipped while current
+- Image headers: PNG, GIF, JPEG and WebP sizes, read from the published
+  files
+- Search index: incremental shards match a full build's, compressed
+  siblings included
+- Usage: python3 test_build_simple.py (or python3 -m pytest test_build_simple.py)
+"""
+
+import io
+import os
+import sys
+import gzip
+import json
+import struct
+import shutil
+import tempfile
+from contextlib import redirect_stdout
+from pathlib import Path
+from unittest import mock
+
+ROOT = Path(__file__).resolve().parent
+sys.path.insert(0, str(ROOT / "benchmarks"))
+
+from build_simple import (
+    FRONTMATTER_CACHE_NAME,
+    MANIFEST_NAME,
+    build_site,
+    get_all_posts,
+    md_to_html,
+    minify_css,
+    minify_html,
+    minify_js,
+    parse_frontmatter,
+    parse_yaml,
+    post_entry,
+    publish_asset,
+    read_body,
+    read_frontmatter,
+    read_image_size,
+    render_post_page,
+)
+from corpus import png, write_site
+
+
+def write_post(root, text, section="research", slug="post"):
+    """Write text as a post's index.qmd under root and return its post dict"""
+    path = Path(root) / section / slug / "index.qmd"
+    path.parent.mkdir(parents=True, exist_ok=True)
+    path.write_bytes(text.encode("utf-8"))
+    frontmatter, body_offset = read_frontmatter(path)
+    return post_entry(section, path, frontmatter, body_offset)
+
+
+def test_heading_slugs():
+    headings = []
+    html = md_to_html("# Intro\n\n## Intro\n\n## Intro\n\n## The *Big* [Idea](x.html)\n", headings)
+    assert [h["slug"] for h in headings] == ["intro", "intro-1", "intro-2", "the-big-idea"]
+    assert '<h2 id="intro-2">Intro</h2>' in html
+    # Slugs and TOC labels come from the heading's text, not its markup
+    assert headings[3]["plain"] == "The Big Idea"
+    assert headings[3]["text"] == 'The <em>Big</em> <a href="x.html">Idea</a>'
+
+
+def test_table_of_contents():
+    with tempfile.TemporaryDirectory() as tmp:
+        post = write_post(
+            tmp,
+            "---\ntitle: Intro\ntoc: true\n---\n\n# Intro\n\n"
+            "## The *Big* [Idea](x.html)\n\n## Intro\n",
+        )
+        html = render_post_page(post)
+    # Labels are the headings' plain text; the post's title is left out
+    assert '<a href="#the-big-idea">The Big Idea</a></li>' in html
+    assert '<a href="#intro' not in html
+    assert '<h2 id="intro-1">Intro</h2>' in html
+
+
+def test_emphasis_links_images():
+    html = md_to_html(
+        "Some *em*, **strong** and [a link](https://a.b/c?d=1&e=2) ![alt text](img/p.png)\n"
+    )
+    assert "<em>em</em>" in html
+    assert "<strong>strong</strong>" in html
+    assert '<a href="https://a.b/c?d=1&e=2">a link</a>' in html
+    assert '<img src="img/p.png" alt="alt text"' in html
+
+
+def test_fenced_code():
+    html = md_to_html("```python\nx = 1 < 2 and *a*\n# not a heading\n```\n\nAfter\n")
+    assert '<pre><code class="language-python">' in html
+    assert "x = 1 &lt; 2 and *a*" in html
+    assert "<em>" not in html and "<h1" not in html
+    assert "<p>After</p>" in html
+
+
+def test_render_time_limit():
+    md = "# Title\n\nSome *em* and [a link](u.html)\n\n```\nx < 1\n```\n"
+    headings = []
+    out = io.StringIO()
+    with redirect_stdout(out):
+        html = md_to_html(md, headings, time_limit=0, name="slow.qmd")
+    assert "slow.qmd" in out.getvalue() and "3 of 3 paragraphs" in out.getvalue()
+    # Past the limit inline markup is left as written; headings keep their
+    # anchors and code is still escaped
+    assert "<p>Some *em* and [a link](u.html)</p>" in html
+    assert '<h1 id="title">Title</h1>' in html and headings[0]["slug"] == "title"
+    assert "x &lt; 1" in html
+
+    # Long runs of markup characters render well within the limit
+    for run in ("*" * 50000 + "a", "[" * 50000, "<" * 50000, "`" * 50000):
+        out = io.StringIO()
+        with redirect_stdout(out):
+            md_to_html(run)
+        assert out.getvalue() == "", run[:2]
+
+
+def test_yaml_comments_and_lists():
+    data = parse_yaml(
+        'title: "A: b" # trailing comment\n'
+        "# a full-line comment\n"
+        'categories: [ml, "x, y"]\n'
+        "tags:\n"
+        "  - one\n"
+        "  - two # comment\n"
+        "author:\n"
+        "  name: Z\n"
+        "  links:\n"
+        "    - url: u\n"
+        "      label: l\n"
+        "empty:\n"
+    )
+    assert data == {
+        "title": "A: b",
+        "categories": ["ml", "x, y"],
+        "tags": ["one", "two"],
+        "author": {"name": "Z", "links": [{"url": "u", "label": "l"}]},
+        "empty": "",
+    }
+
+
+def test_frontmatter_split():
+    assert parse_frontmatter("---\ntitle: T\n---\n\nBody\n") == ({"title": "T"}, "Body\n")
+    assert parse_frontmatter("No frontmatter\n") == ({}, "No frontmatter\n")
+
+
+def test_frontmatter_body_offset():
+    texts = [
+        "---\ntitle: A\n---\nBody\n",
+        "---\ntitle: Caf\u00e9\n---\n\n\n# Heading\n\nBody\n",
+        "---\r\ntitle: A\r\ncategories: [x]\r\n---\r\n\r\nLine one\r\nLine two\r\n",
+        "---\ntitle: A\n---\n",
+        "---\ntitle: A\nno closing fence\n",
+        "No frontmatter\n---\n",
+    ]
+    with tempfile.TemporaryDirectory() as tmp:
+        path = Path(tmp) / "index.qmd"
+        for text in texts:
+            path.write_bytes(text.encode("utf-8"))
+            frontmatter, offset = read_frontmatter(path)
+            # Text mode reads CRLF as LF, which is what the builder parsed
+            assert (frontmatter, read_body(path, offset)) == parse_frontmatter(
+                path.read_text(encoding="utf-8")
+            ), repr(text)
+
+
+def test_frontmatter_cache():
+    with tempfile.TemporaryDirectory() as tmp:
+        root = Path(tmp)
+        write_post(root, "---\ntitle: Alpha\ndate: 2024-01-02\n---\nBody\n")
+        path = root / "research" / "post" / "index.qmd"
+        assert [p["title"] for p in get_all_posts(root)] == ["Alpha"]
+        assert (root / FRONTMATTER_CACHE_NAME).exists()
+
+        # A cache hit reads no frontmatter at all
+        with mock.patch("build_simple.read_frontmatter", side_effect=AssertionError):
+            posts = get_all_posts(root)
+        assert [(p["title"], p["date"]) for p in posts] == [("Alpha", "2024-01-02")]
+
+        # A same-size edit is caught by its mtime
+        mtime = path.stat().st_mtime_ns
+        path.write_bytes(b"---\ntitle: Gamma\ndate: 2024-01-02\n---\nBody\n")
+        os.utime(path, ns=(mtime + 10**9, mtime + 10**9))
+        assert [p["title"] for p in get_all_posts(root)] == ["Gamma"]
+
+        path.write_bytes(b"---\ntitle: Delta, longer\n---\n\nNew body\n")
+        (post,) = get_all_posts(root)
+        assert post["title"] == "Delta, longer"
+        assert read_body(path, post["body_offset"]) == "New body\n"
+
+
+def test_minifiers_keep_code():
+    html = minify_html(
+        "<div>\n  <p>a   b</p>\n<pre>  x\n   y</pre>\n<script>\n  var a  =  1;\n</script>\n"
+        "<code>a  b</code> <span>$$x  +  y$$</span></div>\n"
+    )
+    assert "<p>a b</p>" in html
+    assert "<pre>  x\n   y</pre>" in html
+    assert "<script>\n  var a  =  1;\n</script>" in html
+    assert "<code>a  b</code>" in html
+    assert "$$x  +  y$$" in html
+    assert minify_css("a  {  color: red ; } /* c */ b::after { content: '  x  ' }") == (
+        "a{color: red} b::after{content: '  x  '}\n"
+    )
+    assert minify_js("  // comment\n  var a = 1;\n\n  x = 'http://a'\n") == (
+        "var a = 1;\nx = 'http://a'\n"
+    )
+
+
+def build(site, incremental=False, output=None, **options):
+    """Build a site quietly, returning what it printed"""
+    out = io.StringIO()
+    with redirect_stdout(out):
+        build_site(site, output or site / "_site", incremental=incremental, **options)
+    return out.getvalue()
+
+
+def site_files(output):
+    """Every file of a built site, by path, with its bytes"""
+    return {
+        path.relative_to(output).as_posix(): path.read_bytes()
+        for path in sorted(output.rglob("*"))
+        if path.is_file()
+    }
+
+
+def test_parallel_rendering():
+    with tempfile.TemporaryDirectory() as tmp:
+        site = write_site(Path(tmp), 4)
+        build(site, output=site / "serial", jobs=1)
+        build(site, output=site / "parallel", jobs=3)
+        assert site_files(site / "serial") == site_files(site / "parallel")
+
+
+def test_listing_pagination():
+    with tempfile.TemporaryDirectory() as tmp:
+        site = write_site(Path(tmp), 3)
+        output = site / "_site"
+        build(site, page_size=4)
+        first = (output / "index.html").read_text(encoding="utf-8")
+        second = (output / "index-2.html").read_text(encoding="utf-8")
+        research = (output / "research.html").read_text(encoding="utf-8")
+        assert not (output / "index-3.html").exists()
+        assert not (output / "research-2.html").exists()
+
+        # Six posts split four and two; three research posts fit one page
+        assert first.count('class="post-item"') == 4
+        assert second.count('class="post-item"') == 2
+        assert research.count('class="post-item"') == 3
+
+        assert 'class="pagination-next" href="index-2.html"' in first
+        assert "pagination-prev" not in first and "Page 1 of 2" in first
+        assert 'class="pagination-prev" href="index.html"' in second
+        assert "pagination-next" not in second and "Page 2 of 2" in second
+        assert 'class="pagination"' not in research
+
+
+def test_incremental_builds():
+    with tempfile.TemporaryDirectory() as tmp:
+        site = write_site(Path(tmp), 3)
+        output = site / "_site"
+        build(site)
+        assert (site / MANIFEST_NAME).exists()
+
+        assert "0 outputs rebuilt" in build(site, incremental=True)
+
+        post = site / "research" / "post-00001"
+        index = post / "index.qmd"
+        index.write_text(index.read_text(encoding="utf-8") + "\nzebraword\n", encoding="utf-8")
+        assert "0 outputs rebuilt" not in build(site, incremental=True)
+        assert "zebraword" in (output / "research_post-00001.html").read_text(encoding="utf-8")
+
+        assert (output / "research_post-00001_images").exists()
+        shutil.rmtree(post)
+        assert "0 removed" not in build(site, incremental=True)
+        assert not (output / "research_post-00001.html").exists()
+        assert not (output / "research_post-00001_images").exists()
+
+
+def test_asset_modes():
+    with tempfile.TemporaryDirectory() as tmp:
+        src = Path(tmp) / "src.png"
+        src.write_bytes(png(4, 4, (1, 2, 3)))
+        for mode in ("copy", "reflink", "hardlink"):
+            dst = Path(tmp) / f"{mode}.png"
+            dst.write_bytes(b"stale")
+            publish_asset(src, dst, mode)
+            assert dst.read_bytes() == src.read_bytes(), mode
+            assert dst.samefile(src) == (mode == "hardlink"), mode
+
+        # Without hardlinks (e.g. across devices) the file is still published
+        dst = Path(tmp) / "fallback.png"
+        with mock.patch("os.link", side_effect=OSError):
+            publish_asset(src, dst, "hardlink")
+        assert dst.read_bytes() == src.read_bytes()
+        assert not dst.samefile(src)
+
+
+def test_unchanged_assets_skipped():
+    with tempfile.TemporaryDirectory() as tmp:
+        site = write_site(Path(tmp), 1)
+        output = site / "_site"
+        build(site, asset_mode="copy")
+        image = next(output.glob("research_*_images/*.png"))
+        slug = image.parent.name[len("research_") : -len("_images")]
+        source = site / "research" / slug / "images" / image.name
+        before = image.stat()
+
+        build(site, incremental=True, asset_mode="copy")
+        after = image.stat()
+        assert (after.st_ino, after.st_ctime_ns) == (before.st_ino, before.st_ctime_ns)
+
+        source.write_bytes(png(5, 5, (4, 5, 6)))
+        build(site, incremental=True, asset_mode="copy")
+        assert image.read_bytes() == source.read_bytes()
+
+
+def test_precompressed_outputs():
+    with tempfile.TemporaryDirectory() as tmp:
+        site = write_site(Path(tmp), 1)
+        output = site / "_site"
+        build(site)
+        page = output / "research_post-00000.html"
+        packed = output / "research_post-00000.html.gz"
+        assert gzip.decompress(packed.read_bytes()) == page.read_bytes()
+        assert not list(output.glob("*_images/*.gz"))
+        before = packed.stat()
+
+        build(site, incremental=True)
+        after = packed.stat()
+        assert (after.st_ino, after.st_ctime_ns) == (before.st_ino, before.st_ctime_ns)
+
+        index = site / "research" / "post-00000" / "index.qmd"
+        index.write_text(index.read_text(encoding="utf-8") + "\nzebraword\n", encoding="utf-8")
+        build(site, incremental=True)
+        assert b"zebraword" in gzip.decompress(packed.read_bytes())
+
+
+def test_outputs_sharing_a_manifest():
+    with tempfile.TemporaryDirectory() as tmp:
+        site = write_site(Path(tmp), 3)
+        build(site, output=site / "a", page_size=1)
+        build(site, output=site / "b", page_size=3)
+        # The manifest now describes b: building a from it must not keep
+        # a's pages as they were
+        build(site, output=site / "a", incremental=True, page_size=3)
+        assert not (site / "a" / "index-3.html").exists()
+        assert "0 outputs rebuilt" in build(site, output=site / "a", incremental=True, page_size=3)
+
+
+def test_image_headers():
+    gif = b"GIF89a" + struct.pack("<HH", 31, 17) + b"\x00" * 22
+    jpeg = (
+        b"\xff\xd8"
+        + b"\xff\xe0" + struct.pack(">H", 16) + b"JFIF\x00" + b"\x00" * 9
+        + b"\xff\xff\xc0" + struct.pack(">HBHH", 17, 8, 480, 640) + b"\x00" * 10
+    )
+    vp8l_bits = (320 - 1) | (200 - 1) << 14
+    webp_lossless = b"RIFF\x00\x00\x00\x00WEBPVP8L\x00\x00\x00\x00\x2f" + struct.pack(
+        "<I", vp8l_bits
+    ) + b"\x00" * 8
+    webp_lossy = (
+        b"RIFF\x00\x00\x00\x00WEBPVP8 \x00\x00\x00\x00"
+        + b"\x00\x00\x00\x9d\x01\x2a"
+        + struct.pack("<HH", 800, 600)
+        + b"\x00" * 4
+    )
+    webp_extended = (
+        b"RIFF\x00\x00\x00\x00WEBPVP8X\x0a\x00\x00\x00\x00\x00\x00\x00"
+        + (1024 - 1).to_bytes(3, "little")
+        + (768 - 1).to_bytes(3, "little")
+        + b"\x00" * 4
+    )
+    cases = {
+        "a.png": (png(64, 48, (1, 2, 3)), (64, 48)),
+        "a.gif": (gif, (31, 17)),
+        "a.jpg": (jpeg, (640, 480)),
+        "lossless.webp": (webp_lossless, (320, 200)),
+        "lossy.webp": (webp_lossy, (800, 600)),
+        "extended.webp": (webp_extended, (1024, 768)),
+        "not-an-image.png": (b"plain text, not an image", None),
+        "truncated.jpg": (b"\xff\xd8\xff\xe0\x00", None),
+    }
+    with tempfile.TemporaryDirectory() as tmp:
+        for name, (data, size) in cases.items():
+            path = Path(tmp) / name
+            path.write_bytes(data)
+            assert read_image_size(path) == size, name
+
+
+def test_image_sizes_of_resized_outputs():
+    with tempfile.TemporaryDirectory() as tmp:
+        site = write_site(Path(tmp), 1)
+        output = site / "_site"
+        build(site)
+        image = next(output.glob("research_*_images/*.png"))
+        page = output / f"{image.parent.name[: -len('_images')]}.html"
+        width, height = read_image_size(image)
+        assert f'width="{width}" height="{height}"' in page.read_text(encoding="utf-8")
+
+        # As optimize_images.py does, shrink the published image in place
+        image.unlink()
+        image.write_bytes(png(width // 2, height // 2, (1, 2, 3)))
+        build(site, incremental=True)
+        html = page.read_text(encoding="utf-8")
+        assert f'width="{width // 2}" height="{height // 2}"' in html
+
+
+def search_view(output):
+    """The search index and full-text shards with posts named by URL"""
+    index = json.loads((output / "search-index.json").read_text(encoding="utf-8"))
+    urls = [post and post["url"] for post in index["posts"]]
+    terms = {}
+    for shard in (output / "search").glob("t-*.json"):
+        for term, postings in json.loads(shard.read_text(encoding="utf-8")).items():
+            terms[term] = sorted((urls[post_id], count) for post_id, count in postings)
+    grams = {}
+    for shard in (output / "search").glob("g-*.json"):
+        grams.update(json.loads(shard.read_text(encoding="utf-8")))
+    lengths = {url: length for url, length in zip(urls, index["lengths"]) if url}
+    files = sorted(path.name for path in (output / "search").iterdir())
+    return terms, grams, lengths, index["avgLength"], files
+
+
+def test_incremental_search():
+    with tempfile.TemporaryDirectory() as tmp:
+        site = write_site(Path(tmp), 3)
+        output = site / "_site"
+        build(site)
+
+        post = site / "books" / "post-00009"
+        shutil.copytree(site / "books" / "post-00001", post)
+        index = post / "index.qmd"
+        index.write_text(index.read_text(encoding="utf-8") + "\nzyzzyva\n", encoding="utf-8")
+        build(site, incremental=True)
+        assert (output / "search" / "t-zy.json.gz").exists()
+
+        shutil.rmtree(post)
+        build(site, incremental=True)
+        assert not (output / "search" / "t-zy.json").exists()
+        assert not (output / "search" / "t-zy.json.gz").exists()
+        manifest = json.loads((site / MANIFEST_NAME).read_text(encoding="utf-8"))
+        assert not [rel for rel in manifest["outputs"] if rel.startswith("search/t-zy")]
+
+        # A shard deleted by hand is written again
+        shard = next((output / "search").glob("t-*.json"))
+        shard.unlink()
+        build(site, incremental=True)
+        assert shard.exists()
+
+        incremental = search_view(output)
+        build(site)
+        assert search_view(output) == incremental
+
+
+if __name__ == "__main__":
+    tests = [(name, test) for name, test in globals().items() if name.startswith("test_")]
+    failed = 0
+    for name, test in tests:
+        try:
+            test()
+        except AssertionError as e:
+            failed += 1
+            print(f"✗ {name}: {e}")
+        else:
+            print(f"✓ {name}")
+    print(f"\n{len(tests) - failed}/{len(tests)} checks passed")
+    sys.exit(1 if failed else 0)